@@ -1,30 +1,91 @@
+from django.db import connections
+from django.db.models import Count, Exists, OuterRef
 from django_filters import rest_framework as filters
 
-from recipes.models import Ingredient, Recipe, Tag
+from constants import Tags
+from recipes.models import Ingredient, Recipe, RecipeTag
+from recipes.search import search_recipes
+from recipes.tags import get_tag_choices, tag_index
 
 
 class IngredientFilter(filters.FilterSet):
-    name = filters.CharFilter(lookup_expr="startswith")
+    name = filters.CharFilter(method="filter_name")
 
     class Meta:
         model = Ingredient
         fields = ["name"]
 
+    def filter_name(self, queryset, name, value):
+        value = value.lower()
+        if connections[queryset.db].vendor == "sqlite":
+            return queryset.filter(
+                search_name__gte=value, search_name__lt=f"{value}\U0010ffff"
+            )
+        return queryset.filter(search_name__startswith=value)
+
 
 class RecipesFilter(filters.FilterSet):
-    tags = filters.ModelMultipleChoiceFilter(
-        field_name="tags__slug",
-        to_field_name="slug",
-        queryset=Tag.objects.all(),
+    ORDERINGS = {
+        "newest": ["-id"],
+        "popular": ["-favorites_count", "-id"],
+        "trending": ["-trending_score", "-id"],
+        "cooking_time": ["cooking_time", "-id"],
+    }
+
+    tags = filters.MultipleChoiceFilter(
+        choices=get_tag_choices, method="filter_tags"
+    )
+    tags_match = filters.ChoiceFilter(
+        choices=[
+            (Tags.MATCH_ANY.value, "Любой из тегов"),
+            (Tags.MATCH_ALL.value, "Все теги"),
+        ],
+        method="filter_tags_match",
     )
     is_favorited = filters.BooleanFilter(method="filter_is_favorited")
     is_in_shopping_cart = filters.BooleanFilter(
         method="filter_is_in_shopping_cart"
     )
+    search = filters.CharFilter(method="filter_search")
+    ordering = filters.ChoiceFilter(
+        choices=[(ordering, ordering) for ordering in ORDERINGS],
+        method="filter_ordering",
+    )
 
     class Meta:
         model = Recipe
-        fields = ["tags", "author", "is_favorited", "is_in_shopping_cart"]
+        fields = [
+            "tags",
+            "tags_match",
+            "author",
+            "is_favorited",
+            "is_in_shopping_cart",
+            "search",
+            "ordering",
+        ]
+
+    def filter_tags(self, queryset, name, value):
+        tag_ids = tag_index.get_ids(value)
+        if not tag_ids:
+            return queryset
+        if self.form.cleaned_data.get("tags_match") == Tags.MATCH_ALL.value:
+            return queryset.filter(
+                pk__in=RecipeTag.objects.filter(tag_id__in=tag_ids)
+                .values("recipe_id")
+                .annotate(tags_count=Count("tag_id"))
+                .filter(tags_count=len(tag_ids))
+                .values("recipe_id")
+            )
+        return queryset.filter(
+            Exists(
+                RecipeTag.objects.filter(
+                    recipe=OuterRef("pk"), tag_id__in=tag_ids
+                )
+            )
+        )
+
+    def filter_tags_match(self, queryset, name, value):
+        return queryset
 
     def filter_is_favorited(self, queryset, name, value):
         if value:
@@ -35,3 +96,9 @@ class RecipesFilter(filters.FilterSet):
         if value:
             return queryset.filter(shoppingcart__user__id=self.request.user.id)
         return queryset
+
+    def filter_search(self, queryset, name, value):
+        return search_recipes(queryset, value)
+
+    def filter_ordering(self, queryset, name, value):
+        return queryset.order_by(*self.ORDERINGS[value])
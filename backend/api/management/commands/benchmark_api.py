@@ -0,0 +1,568 @@
+import json
+import random
+import re
+import time
+from collections import defaultdict
+from contextlib import ExitStack
+from itertools import count
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.test import Client
+from django.test.utils import (
+    CaptureQueriesContext,
+    setup_test_environment,
+    teardown_test_environment,
+)
+from rest_framework.authtoken.models import Token
+
+from foodgram_backend.db import REPLICA
+from recipes.models import (
+    Favorite,
+    Ingredient,
+    Recipe,
+    RecipeIngredient,
+    RecipeTag,
+    ShoppingCart,
+    Tag,
+)
+from users.models import Subscription
+
+User = get_user_model()
+
+DATA_DIR = settings.BASE_DIR.parent / "data"
+PASSWORD = "BenchPassword-123"
+ROUTE_ID = re.compile(r"/\d+/")
+IMAGE = (
+    "data:image/png;base64,iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAA"
+    "DUlEQVR42mP8z8DwHwAFBQIAX8jx0gAAAABJRU5ErkJggg=="
+)
+
+
+def percentile(values, percent):
+    ordered = sorted(values)
+    index = max(0, round(percent / 100 * len(ordered)) - 1)
+    return ordered[index]
+
+
+class Command(BaseCommand):
+    help = (
+        "Нагрузочный замер API: создаёт синтетические данные во временной "
+        "базе и измеряет время ответа, число SQL-запросов и размер ответа "
+        "для каждого маршрута."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=100)
+        parser.add_argument("--recipes", type=int, default=1000)
+        parser.add_argument(
+            "--ingredients-per-recipe", type=int, nargs=2, default=[3, 15]
+        )
+        parser.add_argument(
+            "--tags-per-recipe", type=int, nargs=2, default=[1, 3]
+        )
+        parser.add_argument("--favorites-per-user", type=int, default=30)
+        parser.add_argument("--cart-per-user", type=int, default=10)
+        parser.add_argument("--subscriptions-per-user", type=int, default=10)
+        parser.add_argument("--iterations", type=int, default=20)
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument(
+            "--ingredients-path",
+            default=str(DATA_DIR / "ingredients.csv"),
+            help="Путь к файлу с ингридиентами",
+        )
+        parser.add_argument(
+            "--tags-path",
+            default=str(DATA_DIR / "tags.csv"),
+            help="Путь к файлу с тегами",
+        )
+        parser.add_argument(
+            "-o",
+            "--output",
+            help="Сохранить результаты в JSON для сравнения прогонов",
+        )
+
+    def handle(self, *args, **options):
+        self.random = random.Random(options["seed"])
+        setup_test_environment()
+        old_name = connection.settings_dict["NAME"]
+        connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        replica_settings = None
+        if REPLICA in connections:
+            replica = connections[REPLICA]
+            replica_settings = replica.settings_dict
+            replica.close()
+            replica.creation.set_as_test_mirror(connection.settings_dict)
+        try:
+            self.seed(options)
+            results = self.run_benchmarks(options["iterations"])
+        finally:
+            if replica_settings is not None:
+                connections[REPLICA].close()
+                connections[REPLICA].settings_dict = replica_settings
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        self.report(results)
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf8") as file:
+                json.dump(
+                    {
+                        "vendor": connection.vendor,
+                        "options": {
+                            key: options[key]
+                            for key in (
+                                "users",
+                                "recipes",
+                                "favorites_per_user",
+                                "cart_per_user",
+                                "subscriptions_per_user",
+                                "iterations",
+                                "seed",
+                            )
+                        },
+                        "results": results,
+                    },
+                    file,
+                    ensure_ascii=False,
+                    indent=2,
+                )
+
+    def seed(self, options):
+        call_command(
+            "import_ingredients", path=options["ingredients_path"], verbosity=0
+        )
+        call_command("import_tags", path=options["tags_path"], verbosity=0)
+        password = make_password(PASSWORD)
+        User.objects.bulk_create(
+            [
+                User(
+                    email=f"user{number}@bench.local",
+                    username=f"user{number}",
+                    first_name="Bench",
+                    last_name=f"User{number}",
+                    password=password,
+                )
+                for number in range(options["users"])
+            ]
+        )
+        user_ids = list(User.objects.values_list("id", flat=True))
+        ingredient_ids = list(Ingredient.objects.values_list("id", flat=True))
+        tag_ids = list(Tag.objects.values_list("id", flat=True))
+
+        Recipe.objects.bulk_create(
+            [
+                Recipe(
+                    author_id=self.random.choice(user_ids),
+                    name=f"Рецепт {number}",
+                    text="Описание рецепта. " * self.random.randint(5, 50),
+                    image="recipes/images/bench.png",
+                    cooking_time=self.random.randint(1, 240),
+                )
+                for number in range(options["recipes"])
+            ],
+            batch_size=1000,
+        )
+        recipe_ids = list(Recipe.objects.values_list("id", flat=True))
+        RecipeIngredient.objects.bulk_create(
+            [
+                RecipeIngredient(
+                    recipe_id=recipe_id,
+                    ingredient_id=ingredient_id,
+                    amount=self.random.randint(1, 500),
+                )
+                for recipe_id in recipe_ids
+                for ingredient_id in self.sample(
+                    ingredient_ids, options["ingredients_per_recipe"]
+                )
+            ],
+            batch_size=1000,
+        )
+        RecipeTag.objects.bulk_create(
+            [
+                RecipeTag(recipe_id=recipe_id, tag_id=tag_id)
+                for recipe_id in recipe_ids
+                for tag_id in self.sample(tag_ids, options["tags_per_recipe"])
+            ],
+            batch_size=1000,
+        )
+        for model, per_user in (
+            (Favorite, options["favorites_per_user"]),
+            (ShoppingCart, options["cart_per_user"]),
+        ):
+            model.objects.bulk_create(
+                [
+                    model(user_id=user_id, recipe_id=recipe_id)
+                    for user_id in user_ids
+                    for recipe_id in self.sample(recipe_ids, [per_user] * 2)
+                ],
+                batch_size=1000,
+            )
+        Subscription.objects.bulk_create(
+            [
+                Subscription(user_id=user_id, author_id=author_id)
+                for user_id in user_ids
+                for author_id in self.sample(
+                    user_ids, [options["subscriptions_per_user"]] * 2
+                )
+                if author_id != user_id
+            ],
+            batch_size=1000,
+        )
+        call_command("recount", verbosity=0)
+        call_command("rebuild_search_index", verbosity=0)
+
+    def sample(self, population, bounds):
+        size = min(self.random.randint(*bounds), len(population))
+        return self.random.sample(population, size)
+
+    def create_user(self, name):
+        return User.objects.create_user(
+            email=f"{name}@bench.local",
+            username=name,
+            first_name="Bench",
+            last_name=name.capitalize(),
+            password=PASSWORD,
+        )
+
+    def get_scenarios(self):
+        user = User.objects.filter(subscriptions__isnull=False).first()
+        if user is None:
+            raise CommandError(
+                "Нет пользователей с подписками: увеличьте --users "
+                "или --subscriptions-per-user."
+            )
+        author = (
+            User.objects.exclude(subscribers__user=user)
+            .exclude(id=user.id)
+            .first()
+        )
+        if author is None:
+            raise CommandError(
+                "Нет автора, на которого пользователь ещё не подписан: "
+                "увеличьте --users или уменьшите --subscriptions-per-user."
+            )
+        recipe = (
+            Recipe.objects.exclude(favorite__user=user)
+            .exclude(shoppingcart__user=user)
+            .first()
+        )
+        if recipe is None:
+            raise CommandError(
+                "Нет рецепта вне избранного и списка покупок пользователя: "
+                "увеличьте --recipes или уменьшите --favorites-per-user "
+                "и --cart-per-user."
+            )
+        token = Token.objects.create(user=user)
+        auth_user = self.create_user("auth")
+        bulk_user = self.create_user("bulk")
+        bulk_token = Token.objects.create(user=bulk_user)
+        bulk_recipe_ids = self.sample(
+            list(Recipe.objects.values_list("id", flat=True)), [20, 20]
+        )
+        ingredients = Ingredient.objects.all()[:10]
+        tag = Tag.objects.first()
+        new_user_numbers = count()
+        headers = {"HTTP_AUTHORIZATION": f"Token {token.key}"}
+        bulk_headers = {"HTTP_AUTHORIZATION": f"Token {bulk_token.key}"}
+        pantry_query = "&".join(
+            f"ingredients={ingredient.id}" for ingredient in ingredients[:3]
+        )
+        recipe_data = {
+            "ingredients": [
+                {"id": ingredient.id, "amount": 10}
+                for ingredient in ingredients
+            ],
+            "tags": [tag.id],
+            "image": IMAGE,
+            "name": "Новый рецепт",
+            "text": "Описание",
+            "cooking_time": 10,
+        }
+
+        def new_user():
+            number = next(new_user_numbers)
+            return {
+                "email": f"new{number}@bench.local",
+                "username": f"new{number}",
+                "first_name": "New",
+                "last_name": "User",
+                "password": PASSWORD,
+            }
+
+        def login_logout():
+            response = yield (
+                "POST",
+                "/api/auth/token/login/",
+                {"email": auth_user.email, "password": PASSWORD},
+                {},
+            )
+            if response.status_code != 200:
+                return
+            auth_token = response.json()["auth_token"]
+            yield (
+                "POST",
+                "/api/auth/token/logout/",
+                None,
+                {"HTTP_AUTHORIZATION": f"Token {auth_token}"},
+            )
+
+        def recipe_lifecycle():
+            response = yield ("POST", "/api/recipes/", recipe_data, headers)
+            if response.status_code != 201:
+                return
+            url = f"/api/recipes/{response.json()['id']}/"
+            yield ("PATCH", url, recipe_data, headers)
+            yield ("DELETE", url, None, headers)
+
+        def simple(*requests):
+            def scenario():
+                for method, url, data, auth in requests:
+                    if callable(data):
+                        data = data()
+                    yield (method, url, data, auth)
+
+            return scenario
+
+        return {
+            "users": simple(
+                ("GET", "/api/users/", None, {}),
+                ("GET", f"/api/users/{author.id}/", None, {}),
+                ("GET", "/api/users/me/", None, headers),
+                ("GET", "/api/users/subscriptions/", None, headers),
+                (
+                    "GET",
+                    "/api/users/subscriptions/?recipes_limit=3",
+                    None,
+                    headers,
+                ),
+                ("POST", "/api/users/", new_user, {}),
+                (
+                    "POST",
+                    "/api/users/set_password/",
+                    {
+                        "new_password": PASSWORD,
+                        "current_password": PASSWORD,
+                    },
+                    headers,
+                ),
+            ),
+            "subscribe": simple(
+                ("POST", f"/api/users/{author.id}/subscribe/", None, headers),
+                (
+                    "DELETE",
+                    f"/api/users/{author.id}/subscribe/",
+                    None,
+                    headers,
+                ),
+            ),
+            "auth": login_logout,
+            "tags": simple(
+                ("GET", "/api/tags/", None, {}),
+                ("GET", f"/api/tags/{tag.id}/", None, {}),
+            ),
+            "ingredients": simple(
+                ("GET", "/api/ingredients/", None, {}),
+                ("GET", "/api/ingredients/?name=%D0%B0", None, {}),
+                ("GET", f"/api/ingredients/{ingredients[0].id}/", None, {}),
+            ),
+            "recipes": simple(
+                ("GET", "/api/recipes/", None, {}),
+                ("GET", "/api/recipes/", None, headers),
+                ("GET", "/api/recipes/?page=10&limit=6", None, headers),
+                ("GET", f"/api/recipes/?tags={tag.slug}", None, headers),
+                ("GET", f"/api/recipes/?author={author.id}", None, headers),
+                ("GET", "/api/recipes/?search=рецепт", None, headers),
+                ("GET", "/api/recipes/?ordering=popular", None, headers),
+                ("GET", "/api/recipes/?is_favorited=1", None, headers),
+                ("GET", "/api/recipes/?is_in_shopping_cart=1", None, headers),
+                ("GET", f"/api/recipes/{recipe.id}/", None, headers),
+                (
+                    "GET",
+                    "/api/recipes/download_shopping_cart/",
+                    None,
+                    headers,
+                ),
+            ),
+            "pantry": simple(
+                ("GET", f"/api/recipes/pantry/?{pantry_query}", None, {}),
+                (
+                    "GET",
+                    f"/api/recipes/pantry/?{pantry_query}",
+                    None,
+                    headers,
+                ),
+            ),
+            "autocomplete": simple(
+                (
+                    "GET",
+                    "/api/ingredients/autocomplete/?name=%D0%BC%D0%BE",
+                    None,
+                    {},
+                ),
+                (
+                    "GET",
+                    "/api/ingredients/autocomplete/"
+                    "?name=%D0%BC%D0%BE&limit=50",
+                    None,
+                    {},
+                ),
+            ),
+            "recipe_lifecycle": recipe_lifecycle,
+            "favorite": simple(
+                ("POST", f"/api/recipes/{recipe.id}/favorite/", None, headers),
+                (
+                    "DELETE",
+                    f"/api/recipes/{recipe.id}/favorite/",
+                    None,
+                    headers,
+                ),
+            ),
+            "shopping_cart": simple(
+                (
+                    "POST",
+                    f"/api/recipes/{recipe.id}/shopping_cart/",
+                    None,
+                    headers,
+                ),
+                (
+                    "DELETE",
+                    f"/api/recipes/{recipe.id}/shopping_cart/",
+                    None,
+                    headers,
+                ),
+            ),
+            "shopping_cart_summary": simple(
+                ("GET", "/api/recipes/shopping_cart/", None, headers),
+            ),
+            "favorite_bulk": simple(
+                (
+                    "POST",
+                    "/api/recipes/favorite/bulk/",
+                    {"recipes": bulk_recipe_ids},
+                    bulk_headers,
+                ),
+                ("GET", "/api/recipes/favorite/bulk/", None, bulk_headers),
+                ("DELETE", "/api/recipes/favorite/", None, bulk_headers),
+            ),
+            "shopping_cart_bulk": simple(
+                (
+                    "POST",
+                    "/api/recipes/shopping_cart/bulk/",
+                    {"recipes": bulk_recipe_ids},
+                    bulk_headers,
+                ),
+                (
+                    "GET",
+                    "/api/recipes/shopping_cart/bulk/",
+                    None,
+                    bulk_headers,
+                ),
+                ("DELETE", "/api/recipes/shopping_cart/", None, bulk_headers),
+            ),
+            "shopping_cart_batch": simple(
+                (
+                    "POST",
+                    "/api/recipes/shopping_cart/batch/",
+                    {
+                        "add": bulk_recipe_ids[:10],
+                        "remove": bulk_recipe_ids[10:],
+                    },
+                    bulk_headers,
+                ),
+                (
+                    "POST",
+                    "/api/recipes/shopping_cart/batch/",
+                    {
+                        "add": bulk_recipe_ids[10:],
+                        "remove": bulk_recipe_ids[:10],
+                    },
+                    bulk_headers,
+                ),
+            ),
+        }
+
+    def run_benchmarks(self, iterations):
+        client = Client()
+        samples = defaultdict(list)
+        scenarios = self.get_scenarios()
+        for _ in range(iterations):
+            for scenario in scenarios.values():
+                steps = scenario()
+                response = None
+                while True:
+                    try:
+                        method, url, data, auth = steps.send(response)
+                    except StopIteration:
+                        break
+                    response, sample = self.measure(
+                        client, method, url, data, auth
+                    )
+                    route = ROUTE_ID.sub("/{id}/", url)
+                    user = "auth" if auth else "anon"
+                    samples[f"{method} {route} [{user}]"].append(sample)
+        return {
+            route: {
+                "status": route_samples[-1]["status"],
+                "p50_ms": percentile(
+                    [sample["time"] for sample in route_samples], 50
+                ),
+                "p95_ms": percentile(
+                    [sample["time"] for sample in route_samples], 95
+                ),
+                "queries": percentile(
+                    [sample["queries"] for sample in route_samples], 50
+                ),
+                "bytes": percentile(
+                    [sample["bytes"] for sample in route_samples], 50
+                ),
+            }
+            for route, route_samples in samples.items()
+        }
+
+    def measure(self, client, method, url, data, auth):
+        request = getattr(client, method.lower())
+        with ExitStack() as stack:
+            queries = [
+                stack.enter_context(CaptureQueriesContext(database))
+                for database in connections.all()
+            ]
+            start = time.perf_counter()
+            response = request(
+                url,
+                data={} if data is None else data,
+                content_type="application/json",
+                **auth,
+            )
+            if response.streaming:
+                size = sum(len(chunk) for chunk in response.streaming_content)
+            else:
+                size = len(response.content)
+            elapsed = (time.perf_counter() - start) * 1000
+        return response, {
+            "status": response.status_code,
+            "time": elapsed,
+            "queries": sum(len(captured) for captured in queries),
+            "bytes": size,
+        }
+
+    def report(self, results):
+        width = max(len(route) for route in results)
+        self.stdout.write(
+            f"{'route':<{width}}  status   p50 ms   p95 ms  queries     bytes"
+        )
+        for route, result in results.items():
+            self.stdout.write(
+                f"{route:<{width}}  {result['status']:>6}"
+                f"  {result['p50_ms']:>7.2f}  {result['p95_ms']:>7.2f}"
+                f"  {result['queries']:>7}  {result['bytes']:>8}"
+            )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Замер завершён на базе {connection.vendor}."
+            )
+        )
@@ -0,0 +1,131 @@
+from django.contrib.auth import get_user_model
+from django.core.exceptions import EmptyResultSet
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import OuterRef, Subquery
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from api.filterts import IngredientFilter
+from api.views import RecipesViewSet
+from constants import Pagination
+from recipes.models import Ingredient, Recipe, RecipeIngredient, Tag
+from recipes.shopping_list import aggregate_shopping_list
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        "Выводит планы выполнения (EXPLAIN) запросов, которые строят "
+        "фильтры RecipesFilter, аннотации и предзагрузки сериализаторов."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--user",
+            type=int,
+            help="id пользователя, от имени которого строятся запросы",
+        )
+        parser.add_argument(
+            "--analyze",
+            action="store_true",
+            help="Выполнить запросы и вывести фактическое время "
+            "(только PostgreSQL)",
+        )
+
+    def handle(self, *args, **options):
+        if options["user"]:
+            user = User.objects.filter(pk=options["user"]).first()
+        else:
+            user = User.objects.order_by("id").first()
+        if user is None:
+            if options["user"]:
+                raise CommandError("Пользователь не найден.")
+            self.stdout.write(
+                self.style.WARNING(
+                    "В базе нет пользователей: запросы не построены."
+                )
+            )
+            return
+        explain_options = {}
+        if options["analyze"]:
+            if connection.vendor != "postgresql":
+                raise CommandError("--analyze доступен только в PostgreSQL.")
+            explain_options = {"analyze": True, "buffers": True}
+
+        for name, queryset in self.get_queries(user):
+            self.stdout.write(self.style.MIGRATE_HEADING(name))
+            try:
+                sql = str(queryset.query)
+            except EmptyResultSet:
+                self.stdout.write(
+                    self.style.WARNING(
+                        "Нет данных: запрос не обращается к базе."
+                    )
+                )
+            else:
+                if options["verbosity"] > 1:
+                    self.stdout.write(sql)
+                self.stdout.write(queryset.explain(**explain_options))
+            self.stdout.write("")
+
+    def filter_recipes(self, user, params):
+        view = RecipesViewSet(action="list", format_kwarg=None)
+        view.request = Request(
+            APIRequestFactory().get("/api/recipes/", params)
+        )
+        view.request.user = user
+        queryset = view.filter_queryset(view.get_queryset())
+        return queryset[: Pagination.PAGE_SIZE.value]
+
+    def get_queries(self, user):
+        tags = list(Tag.objects.values_list("slug", flat=True)[:2])
+        recipe_ids = list(
+            self.filter_recipes(user, {}).values_list("id", flat=True)
+        )
+        for name, params in (
+            ("Рецепты: лента", {}),
+            ("Рецепты: фильтр по тегам", {"tags": tags}),
+            ("Рецепты: фильтр по автору", {"author": user.id}),
+            ("Рецепты: избранное", {"is_favorited": 1}),
+            ("Рецепты: корзина", {"is_in_shopping_cart": 1}),
+            ("Рецепты: популярные", {"ordering": "popular"}),
+            ("Рецепты: поиск", {"search": "суп"}),
+        ):
+            yield name, self.filter_recipes(user, params)
+
+        yield (
+            "Предзагрузка: ингредиенты рецептов",
+            RecipeIngredient.objects.select_related(
+                "ingredient__measurement_unit"
+            ).filter(recipe__in=recipe_ids),
+        )
+        yield (
+            "Предзагрузка: теги рецептов",
+            Tag.objects.filter(recipe__in=recipe_ids),
+        )
+        authors = User.objects.filter(subscribers__user=user)
+        yield "Подписки", authors[: Pagination.PAGE_SIZE.value]
+        yield (
+            "Подписки: последние рецепты авторов",
+            Recipe.objects.filter(
+                author__in=list(
+                    authors.values_list("id", flat=True)[
+                        : Pagination.PAGE_SIZE.value
+                    ]
+                ),
+                pk__in=Subquery(
+                    Recipe.objects.filter(author=OuterRef("author"))
+                    .order_by("-id")
+                    .values("pk")[:3]
+                ),
+            ),
+        )
+        yield "Список покупок", aggregate_shopping_list(user)
+        yield (
+            "Ингредиенты: поиск по началу названия",
+            IngredientFilter(
+                {"name": "мол"}, queryset=Ingredient.objects.all()
+            ).qs,
+        )
@@ -0,0 +1,91 @@
+from hashlib import md5
+
+from django.db.models import Count, Max
+from django.utils.cache import (
+    get_conditional_response,
+    patch_cache_control,
+    patch_vary_headers,
+)
+from django.utils.functional import cached_property
+from django.utils.http import http_date, quote_etag
+from rest_framework.response import Response
+
+from foodgram_backend.db import replica_reads
+from recipes.relationships import RelationshipSnapshot
+
+
+class ReplicaReadMixin:
+    replica_actions = ["list", "retrieve"]
+
+    def dispatch(self, request, *args, **kwargs):
+        action = self.action_map.get(request.method.lower())
+        with replica_reads(action in self.replica_actions):
+            return super().dispatch(request, *args, **kwargs)
+
+
+class RelationshipsMixin:
+    @cached_property
+    def relationships(self):
+        return RelationshipSnapshot(self.request.user)
+
+    def get_serializer_context(self):
+        return {
+            **super().get_serializer_context(),
+            "relationships": self.relationships,
+        }
+
+
+class ConditionalRetrieveMixin:
+    cache_control = {"public": True, "max_age": 0}
+    vary_headers = []
+
+    def get_object_validators(self, instance):
+        timestamp = instance.updated_at.timestamp()
+        return (instance.pk, timestamp), timestamp
+
+    def conditional_response(self, request, state, timestamp, get_response):
+        etag = quote_etag(md5(repr(state).encode()).hexdigest())
+        last_modified = int(timestamp) if timestamp else None
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified
+        )
+        if response is None:
+            response = get_response()
+        if response.status_code in (200, 304):
+            response["ETag"] = etag
+            if last_modified:
+                response["Last-Modified"] = http_date(last_modified)
+            patch_cache_control(response, **self.cache_control)
+            patch_vary_headers(response, self.vary_headers)
+        return response
+
+    def retrieve(self, request, *args, **kwargs):
+        instance = self.get_object()
+        state, timestamp = self.get_object_validators(instance)
+        return self.conditional_response(
+            request,
+            state,
+            timestamp,
+            lambda: Response(self.get_serializer(instance).data),
+        )
+
+
+class ConditionalListMixin(ConditionalRetrieveMixin):
+    def get_list_validators(self, queryset):
+        state = queryset.aggregate(
+            last_modified=Max("updated_at"), count=Count("pk")
+        )
+        last_modified = state["last_modified"]
+        timestamp = last_modified.timestamp() if last_modified else None
+        return (state["count"], timestamp), None
+
+    def list(self, request, *args, **kwargs):
+        state, timestamp = self.get_list_validators(self.get_queryset())
+        return self.conditional_response(
+            request,
+            state,
+            timestamp,
+            lambda: super(ConditionalListMixin, self).list(
+                request, *args, **kwargs
+            ),
+        )
@@ -1,4 +1,11 @@
-from rest_framework.pagination import PageNumberPagination
+from collections import OrderedDict
+
+from rest_framework.pagination import (
+    BasePagination,
+    CursorPagination,
+    PageNumberPagination,
+)
+from rest_framework.response import Response
 
 from constants import Pagination
 
@@ -6,3 +13,59 @@ from constants import Pagination
 class CustomPageNumberPagination(PageNumberPagination):
     page_size_query_param = "limit"
     page_size = Pagination.PAGE_SIZE.value
+    max_page_size = Pagination.MAX_PAGE_SIZE.value
+
+
+class CustomCursorPagination(CursorPagination):
+    page_size_query_param = "limit"
+    page_size = Pagination.PAGE_SIZE.value
+    max_page_size = Pagination.MAX_PAGE_SIZE.value
+    ordering = "-id"
+    count_query_param = "count"
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.count = None
+        with_count = request.query_params.get(self.count_query_param, "true")
+        if with_count.lower() not in ("false", "0"):
+            self.count = queryset.count()
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_ordering(self, request, queryset, view):
+        if queryset.query.order_by:
+            return tuple(queryset.query.order_by)
+        return super().get_ordering(request, queryset, view)
+
+    def get_paginated_response(self, data):
+        return Response(
+            OrderedDict(
+                [
+                    ("count", self.count),
+                    ("next", self.get_next_link()),
+                    ("previous", self.get_previous_link()),
+                    ("results", data),
+                ]
+            )
+        )
+
+
+class FeedPagination(BasePagination):
+    def __init__(self):
+        self.page_number_paginator = CustomPageNumberPagination()
+        self.cursor_paginator = CustomCursorPagination()
+        self.paginator = self.page_number_paginator
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.cursor_paginator.cursor_query_param in request.query_params:
+            self.paginator = self.cursor_paginator
+        else:
+            self.paginator = self.page_number_paginator
+        return self.paginator.paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        return self.paginator.get_paginated_response(data)
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            *self.page_number_paginator.get_schema_operation_parameters(view),
+            *self.cursor_paginator.get_schema_operation_parameters(view)[:1],
+        ]
@@ -0,0 +1,72 @@
+import csv
+import json
+
+from rest_framework.renderers import BaseRenderer
+
+
+class Echo:
+    def write(self, value):
+        return value
+
+
+class ShoppingListRenderer(BaseRenderer):
+    charset = "utf-8"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return "".join(self.stream(data)).encode(self.charset)
+
+    def stream(self, ingredients):
+        raise NotImplementedError(
+            "ShoppingListRenderer.stream() must be implemented."
+        )
+
+
+class ShoppingListTextRenderer(ShoppingListRenderer):
+    media_type = "text/plain"
+    format = "txt"
+
+    def stream(self, ingredients):
+        yield "Список покупок\n\n"
+        for ingredient in ingredients:
+            yield (
+                f'- {ingredient["name"]} '
+                f'({ingredient["measurement_unit"]})'
+                f' - {ingredient["total_amount"]}\n'
+            )
+
+
+class ShoppingListCSVRenderer(ShoppingListRenderer):
+    media_type = "text/csv"
+    format = "csv"
+
+    def stream(self, ingredients):
+        writer = csv.writer(Echo())
+        yield writer.writerow(["name", "measurement_unit", "amount"])
+        for ingredient in ingredients:
+            yield writer.writerow(
+                [
+                    ingredient["name"],
+                    ingredient["measurement_unit"],
+                    ingredient["total_amount"],
+                ]
+            )
+
+
+class ShoppingListJSONRenderer(ShoppingListRenderer):
+    media_type = "application/json"
+    format = "json"
+
+    def stream(self, ingredients):
+        yield "["
+        separator = ""
+        for ingredient in ingredients:
+            yield separator + json.dumps(
+                {
+                    "name": ingredient["name"],
+                    "measurement_unit": ingredient["measurement_unit"],
+                    "amount": ingredient["total_amount"],
+                },
+                ensure_ascii=False,
+            )
+            separator = ","
+        yield "]"
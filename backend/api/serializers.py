@@ -1,26 +1,44 @@
 import base64
+import binascii
+from functools import partial
+from io import BytesIO
+from uuid import uuid4
 
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import (
+    InMemoryUploadedFile,
+    TemporaryUploadedFile,
+)
+from django.db import transaction
 from djoser.serializers import UserSerializer
 from rest_framework import serializers
 
-from constants import RecipesModels
+from constants import Pantry, RecipeImages, RecipesModels, UserRecipes
+from recipes.images import schedule_image_processing
 from recipes.models import (
-    Favorite,
     Ingredient,
     Recipe,
     RecipeIngredient,
     RecipeTag,
-    ShoppingCart,
     Tag,
     Unit,
 )
+from recipes.relationships import RelationshipSnapshot
 from users.models import Subscription
 
 User = get_user_model()
 
 
+def get_relationships(context):
+    if "relationships" not in context:
+        context["relationships"] = RelationshipSnapshot(
+            context["request"].user
+        )
+    return context["relationships"]
+
+
 class CustomUserSerializer(UserSerializer):
     is_subscribed = serializers.SerializerMethodField(read_only=True)
 
@@ -36,10 +54,7 @@ class CustomUserSerializer(UserSerializer):
         ]
 
     def get_is_subscribed(self, author):
-        user = self.context.get("request").user
-        if user.is_anonymous:
-            return False
-        return user.subscriptions.filter(author=author).exists()
+        return get_relationships(self.context).is_subscribed(author)
 
 
 class SubscriptionsSerializer(CustomUserSerializer):
@@ -77,21 +92,20 @@ class SubscriptionsSerializer(CustomUserSerializer):
                 )
         return data
 
+    @transaction.atomic
     def create(self, validated_data):
         return Subscription.objects.create(**validated_data).author
 
     def get_recipes(self, author):
-        print(author)
-        request = self.context.get("request")
-        recipes_limit = request.GET.get("recipes_limit")
+        recipes_limit = self.context.get("recipes_limit")
         recipes = author.recipes.all()
         if recipes_limit:
-            recipes = recipes[: int(recipes_limit)]
+            recipes = recipes[:recipes_limit]
         serializer = RecipesShortSerializer(recipes, many=True)
         return serializer.data
 
     def get_recipes_count(self, author):
-        return author.recipes.count()
+        return author.recipes_count
 
 
 class TagsSerializer(serializers.ModelSerializer):
@@ -117,14 +131,116 @@ class IngredientsSerializer(serializers.ModelSerializer):
 
 
 class Base64ImageField(serializers.ImageField):
+    default_error_messages = {
+        "too_large": "Размер изображения не должен превышать {max_size} МБ.",
+        "invalid_base64": "Некорректные данные изображения в base64.",
+        "invalid_format": "Неподдерживаемый формат изображения.",
+    }
+
     def to_internal_value(self, data):
         if isinstance(data, str) and data.startswith("data:image"):
-            format, imgstr = data.split(";base64,")
-            ext = format.split("/")[-1]
+            data = self.decode(data.partition(";base64,")[2])
+            try:
+                self.sniff(data)
+                return super().to_internal_value(data)
+            except serializers.ValidationError:
+                data.close()
+                raise
+        if getattr(data, "size", 0) > RecipeImages.MAX_UPLOAD_SIZE.value:
+            self.fail_too_large()
+        if hasattr(data, "seek"):
+            self.sniff(data)
+        return super().to_internal_value(data)
 
-            data = ContentFile(base64.b64decode(imgstr), name="temp." + ext)
+    def fail_too_large(self):
+        self.fail(
+            "too_large",
+            max_size=RecipeImages.MAX_UPLOAD_SIZE.value // (1024 * 1024),
+        )
 
-        return super().to_internal_value(data)
+    def decode(self, encoded):
+        encoded = "".join(encoded.split())
+        size = len(encoded) // 4 * 3
+        if size > RecipeImages.MAX_UPLOAD_SIZE.value:
+            self.fail_too_large()
+        if size > settings.FILE_UPLOAD_MAX_MEMORY_SIZE:
+            file = TemporaryUploadedFile("image", None, size, None)
+        else:
+            file = InMemoryUploadedFile(
+                BytesIO(), None, "image", None, size, None
+            )
+        chunk_size = RecipeImages.DECODE_CHUNK_SIZE.value
+        try:
+            for start in range(0, len(encoded), chunk_size):
+                file.write(
+                    base64.b64decode(
+                        encoded[start:start + chunk_size], validate=True
+                    )
+                )
+        except binascii.Error:
+            file.close()
+            self.fail("invalid_base64")
+        file.size = file.tell()
+        file.seek(0)
+        return file
+
+    def sniff(self, file):
+        position = file.tell()
+        head = file.read(16)
+        file.seek(position)
+        for offset, signature, extension, content_type in (
+            RecipeImages.SIGNATURES.value
+        ):
+            if head[offset:offset + len(signature)] == signature:
+                file.name = f"{uuid4().hex}.{extension}"
+                file.content_type = content_type
+                return
+        self.fail("invalid_format")
+
+
+class BulkPrimaryKeyRelatedField(serializers.ListField):
+    child = serializers.IntegerField(min_value=1)
+    default_error_messages = {
+        "does_not_exist": "Объекты с id {pk_values} не существуют.",
+    }
+
+    def __init__(self, queryset, **kwargs):
+        self.queryset = queryset
+        super().__init__(**kwargs)
+
+    def to_internal_value(self, data):
+        pk_values = super().to_internal_value(data)
+        instances = self.queryset.in_bulk(pk_values)
+        missing = [
+            pk for pk in dict.fromkeys(pk_values) if pk not in instances
+        ]
+        if missing:
+            self.fail(
+                "does_not_exist",
+                pk_values=", ".join(str(pk) for pk in missing),
+            )
+        return [instances[pk] for pk in pk_values]
+
+    def to_representation(self, value):
+        return [instance.pk for instance in value.all()]
+
+
+class ImageVariantsField(serializers.Field):
+    def __init__(self, **kwargs):
+        kwargs["read_only"] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, value):
+        request = self.context.get("request")
+        variants = {}
+        for size, formats in value.items():
+            variants[size] = {}
+            for image_format, name in formats.items():
+                url = default_storage.url(name)
+                if request is not None:
+                    url = request.build_absolute_uri(url)
+                variants[size][image_format] = url
+        return variants
 
 
 class RecipesIngredientsReadSerializer(serializers.ModelSerializer):
@@ -142,7 +258,7 @@ class RecipesIngredientsReadSerializer(serializers.ModelSerializer):
 
 
 class RecipesIngredientsWriteSerializer(serializers.ModelSerializer):
-    id = serializers.PrimaryKeyRelatedField(queryset=Ingredient.objects.all())
+    id = serializers.IntegerField(min_value=1)
 
     class Meta:
         model = RecipeIngredient
@@ -158,6 +274,7 @@ class RecipesReadSerializer(serializers.ModelSerializer):
     is_favorited = serializers.SerializerMethodField()
     is_in_shopping_cart = serializers.SerializerMethodField()
     image = Base64ImageField()
+    image_variants = ImageVariantsField()
 
     class Meta:
         model = Recipe
@@ -170,28 +287,46 @@ class RecipesReadSerializer(serializers.ModelSerializer):
             "is_in_shopping_cart",
             "name",
             "image",
+            "image_variants",
             "text",
             "cooking_time",
         ]
 
     def get_is_favorited(self, recipe):
-        user = self.context.get("request").user
-        if user.is_anonymous:
-            return False
-        return user.favorite.filter(recipe=recipe).exists()
+        return get_relationships(self.context).is_favorited(recipe)
 
     def get_is_in_shopping_cart(self, recipe):
-        user = self.context.get("request").user
-        if user.is_anonymous:
-            return False
-        return user.shoppingcart.filter(recipe=recipe).exists()
+        return get_relationships(self.context).is_in_shopping_cart(recipe)
+
+
+class PantryRecipesSerializer(RecipesReadSerializer):
+    matched_count = serializers.IntegerField(read_only=True)
+    missing_count = serializers.SerializerMethodField()
+    coverage = serializers.FloatField(read_only=True)
+
+    class Meta(RecipesReadSerializer.Meta):
+        fields = [
+            *RecipesReadSerializer.Meta.fields,
+            "matched_count",
+            "missing_count",
+            "coverage",
+        ]
+
+    def get_missing_count(self, recipe):
+        return recipe.ingredients_count - recipe.matched_count
+
+
+class PantrySerializer(serializers.Serializer):
+    ingredients = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=Pantry.MAX_INGREDIENTS.value,
+    )
 
 
 class RecipesWriteSerializer(serializers.ModelSerializer):
     ingredients = RecipesIngredientsWriteSerializer(required=True, many=True)
-    tags = serializers.PrimaryKeyRelatedField(
-        queryset=Tag.objects.all(), many=True
-    )
+    tags = BulkPrimaryKeyRelatedField(queryset=Tag.objects.all())
     image = Base64ImageField()
     cooking_time = serializers.IntegerField(
         min_value=RecipesModels.MIN_POS_INT.value,
@@ -224,14 +359,25 @@ class RecipesWriteSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError(
                 {"ingredients": "Это поле не может быть пустым."}
             )
-        ingredients_list = []
+        ingredient_ids = [item.get("id") for item in value]
+        if len(set(ingredient_ids)) != len(ingredient_ids):
+            raise serializers.ValidationError(
+                {"ingredients": "Ингридиенты не должны повторяться."}
+            )
+        ingredients = Ingredient.objects.in_bulk(ingredient_ids)
+        missing = [pk for pk in ingredient_ids if pk not in ingredients]
+        if missing:
+            raise serializers.ValidationError(
+                {
+                    "ingredients": (
+                        "Ингридиенты с id "
+                        f"{', '.join(str(pk) for pk in missing)} "
+                        "не существуют."
+                    )
+                }
+            )
         for item in value:
-            ingredient = item.get("id")
-            if ingredient in ingredients_list:
-                raise serializers.ValidationError(
-                    {"ingredients": "Ингридиенты не должны повторяться."}
-                )
-            ingredients_list.append(ingredient)
+            item["id"] = ingredients[item["id"]]
         return value
 
     def validate_tags(self, value):
@@ -246,6 +392,15 @@ class RecipesWriteSerializer(serializers.ModelSerializer):
             )
         return value
 
+    def save(self, **kwargs):
+        try:
+            return super().save(**kwargs)
+        finally:
+            image = self.validated_data.get("image")
+            if image is not None:
+                image.close()
+
+    @transaction.atomic
     def create(self, validated_data):
         ingredients = validated_data.pop("ingredients")
         tags = validated_data.pop("tags")
@@ -266,35 +421,70 @@ class RecipesWriteSerializer(serializers.ModelSerializer):
                 for tag_instance in tags
             ]
         )
-        instance.save()
+        transaction.on_commit(
+            partial(schedule_image_processing, instance.pk)
+        )
         return instance
 
+    def update_ingredients(self, instance, ingredients):
+        amounts = {
+            ingredient.get("id").id: ingredient.get("amount")
+            for ingredient in ingredients
+        }
+        to_delete, to_update = [], []
+        for recipe_ingredient in instance.recipe_ingredients.all():
+            amount = amounts.pop(recipe_ingredient.ingredient_id, None)
+            if amount is None:
+                to_delete.append(recipe_ingredient.pk)
+            elif amount != recipe_ingredient.amount:
+                recipe_ingredient.amount = amount
+                to_update.append(recipe_ingredient)
+        if to_delete:
+            RecipeIngredient.objects.filter(pk__in=to_delete).delete()
+        if to_update:
+            RecipeIngredient.objects.bulk_update(to_update, ["amount"])
+        if amounts:
+            RecipeIngredient.objects.bulk_create(
+                [
+                    RecipeIngredient(
+                        recipe=instance,
+                        ingredient_id=ingredient_id,
+                        amount=amount,
+                    )
+                    for ingredient_id, amount in amounts.items()
+                ]
+            )
+
+    def update_tags(self, instance, tags):
+        tag_ids = {tag.id for tag in tags}
+        current_ids = {tag.id for tag in instance.tags.all()}
+        if current_ids - tag_ids:
+            RecipeTag.objects.filter(
+                recipe=instance, tag_id__in=current_ids - tag_ids
+            ).delete()
+        if tag_ids - current_ids:
+            RecipeTag.objects.bulk_create(
+                [
+                    RecipeTag(recipe=instance, tag_id=tag_id)
+                    for tag_id in tag_ids - current_ids
+                ]
+            )
+
+    @transaction.atomic
     def update(self, instance, validated_data):
-        ingredients = validated_data.pop("ingredients")
-        tags = validated_data.pop("tags")
-        instance.ingredients.clear()
-        instance.tags.clear()
-        RecipeIngredient.objects.bulk_create(
-            [
-                RecipeIngredient(
-                    recipe=instance,
-                    ingredient=ingredient.get("id"),
-                    amount=ingredient.get("amount"),
-                )
-                for ingredient in ingredients
-            ]
-        )
-        RecipeTag.objects.bulk_create(
-            [
-                RecipeTag(recipe=instance, tag=tag_instance)
-                for tag_instance in tags
-            ]
-        )
+        self.update_ingredients(instance, validated_data.pop("ingredients"))
+        self.update_tags(instance, validated_data.pop("tags"))
         instance = super().update(instance, validated_data)
-        instance.save()
+        if "image" in validated_data:
+            transaction.on_commit(
+                partial(schedule_image_processing, instance.pk)
+            )
         return instance
 
     def to_representation(self, instance):
+        view = self.context.get("view")
+        if view is not None:
+            instance = view.get_queryset().get(pk=instance.pk)
         serializer = RecipesReadSerializer(
             instance, context={"request": self.context.get("request")}
         )
@@ -303,6 +493,7 @@ class RecipesWriteSerializer(serializers.ModelSerializer):
 
 class RecipesShortSerializer(serializers.ModelSerializer):
     image = Base64ImageField(read_only=True)
+    image_variants = ImageVariantsField()
 
     class Meta:
         model = Recipe
@@ -310,6 +501,7 @@ class RecipesShortSerializer(serializers.ModelSerializer):
             "id",
             "name",
             "image",
+            "image_variants",
             "cooking_time",
         ]
         read_only_fields = [
@@ -319,53 +511,46 @@ class RecipesShortSerializer(serializers.ModelSerializer):
         ]
 
 
-class FavoritesSerializer(RecipesShortSerializer):
-    class Meta(RecipesShortSerializer.Meta):
-        fields = [*RecipesShortSerializer.Meta.fields]
+class UserRecipesBulkSerializer(serializers.Serializer):
+    recipes = BulkPrimaryKeyRelatedField(
+        queryset=Recipe.objects.only("id"),
+        allow_empty=False,
+        max_length=UserRecipes.MAX_BATCH_SIZE.value,
+    )
+
+
+class UserRecipesBatchSerializer(serializers.Serializer):
+    add = BulkPrimaryKeyRelatedField(
+        queryset=Recipe.objects.only("id"),
+        default=list,
+        max_length=UserRecipes.MAX_BATCH_SIZE.value,
+    )
+    remove = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        default=list,
+        max_length=UserRecipes.MAX_BATCH_SIZE.value,
+    )
 
     def validate(self, data):
-        request = self.context.get("request")
-        user = request.user
-        if request.method == "POST":
-            recipe = self.context.get("recipe")
-            if Favorite.objects.filter(user=user, recipe=recipe).exists():
-                raise serializers.ValidationError(
-                    detail="Рецепт уже в избранном."
-                )
-        if request.method == "DELETE":
-            recipe = self.instance
-            if not Favorite.objects.filter(user=user, recipe=recipe).exists():
-                raise serializers.ValidationError(
-                    detail="Рецепта нет в избранном."
-                )
+        add = {recipe.pk for recipe in data["add"]}
+        remove = set(data["remove"])
+        if not add and not remove:
+            raise serializers.ValidationError(
+                detail="Укажите рецепты для добавления или удаления."
+            )
+        if add & remove:
+            raise serializers.ValidationError(
+                detail="Рецепт не может быть одновременно добавлен и удалён."
+            )
         return data
 
-    def create(self, validated_data):
-        return Favorite.objects.create(**validated_data).recipe
 
+class ShoppingListIngredientSerializer(serializers.Serializer):
+    name = serializers.CharField()
+    measurement_unit = serializers.CharField()
+    amount = serializers.IntegerField(source="total_amount")
 
-class ShoppingCartSerializer(RecipesShortSerializer):
-    class Meta(RecipesShortSerializer.Meta):
-        fields = [*RecipesShortSerializer.Meta.fields]
 
-    def validate(self, data):
-        request = self.context.get("request")
-        user = request.user
-        if request.method == "POST":
-            recipe = self.context.get("recipe")
-            if ShoppingCart.objects.filter(user=user, recipe=recipe).exists():
-                raise serializers.ValidationError(
-                    detail="Рецепт уже в списке покупок."
-                )
-        if request.method == "DELETE":
-            recipe = self.instance
-            if not ShoppingCart.objects.filter(
-                user=user, recipe=recipe
-            ).exists():
-                raise serializers.ValidationError(
-                    detail="Рецепта нет в списке покупок."
-                )
-        return data
-
-    def create(self, validated_data):
-        return ShoppingCart.objects.create(**validated_data).recipe
+class ShoppingListSerializer(serializers.Serializer):
+    recipes_count = serializers.IntegerField()
+    ingredients = ShoppingListIngredientSerializer(many=True)
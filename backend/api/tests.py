@@ -0,0 +1,520 @@
+import base64
+from io import BytesIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from PIL import Image
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import ValidationError
+from rest_framework.test import APIClient
+
+from recipes.autocomplete import ingredient_index
+from api.serializers import Base64ImageField
+from recipes import shopping_list
+from recipes.models import (
+    Favorite,
+    Ingredient,
+    Recipe,
+    RecipeIngredient,
+    RecipeTag,
+    ShoppingCart,
+    Tag,
+    Unit,
+)
+from recipes.tags import tag_index
+from users.models import Subscription
+from users.tokens import token_cache
+
+User = get_user_model()
+
+
+@override_settings(
+    CACHES={
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        }
+    }
+)
+class APITestCase(TestCase):
+    @classmethod
+    def create_user(cls, name):
+        return User.objects.create_user(
+            email=f"{name}@test.local",
+            username=name,
+            first_name=name.capitalize(),
+            last_name="Test",
+            password="TestPassword-123",
+        )
+
+    @classmethod
+    def create_recipe(cls, number, ingredients_count=3):
+        recipe = Recipe.objects.create(
+            author=cls.author,
+            name=f"Рецепт {number}",
+            text="Описание",
+            image="recipes/images/test.png",
+            cooking_time=10,
+        )
+        RecipeIngredient.objects.bulk_create(
+            [
+                RecipeIngredient(
+                    recipe=recipe, ingredient=ingredient, amount=number + 1
+                )
+                for ingredient in cls.ingredients[:ingredients_count]
+            ]
+        )
+        RecipeTag.objects.bulk_create(
+            [RecipeTag(recipe=recipe, tag=tag) for tag in cls.tags]
+        )
+        return recipe
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = cls.create_user("user")
+        cls.author = cls.create_user("author")
+        unit = Unit.objects.create(name="г")
+        cls.ingredients = [
+            Ingredient.objects.create(
+                name=f"Ингредиент {number}", measurement_unit=unit
+            )
+            for number in range(5)
+        ]
+        cls.tags = [
+            Tag.objects.create(
+                name=f"Тег {number}", color="#ffffff", slug=f"tag{number}"
+            )
+            for number in range(2)
+        ]
+        cls.recipes = [cls.create_recipe(number) for number in range(8)]
+        cls.token = Token.objects.create(user=cls.user)
+
+    def setUp(self):
+        cache.clear()
+        token_cache.local.items.clear()
+        for index in (tag_index, ingredient_index):
+            index.reset()
+            index.get()
+        self.anonymous_client = APIClient()
+        self.user_client = APIClient()
+        self.user_client.credentials(
+            HTTP_AUTHORIZATION=f"Token {self.token.key}"
+        )
+
+    def get_client(self, user):
+        client = APIClient()
+        client.credentials(
+            HTTP_AUTHORIZATION=f"Token {Token.objects.create(user=user).key}"
+        )
+        return client
+
+
+class RecipeQueryCountTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        Subscription.objects.create(user=cls.user, author=cls.author)
+        Favorite.objects.create(user=cls.user, recipe=cls.recipes[0])
+        ShoppingCart.objects.create(user=cls.user, recipe=cls.recipes[1])
+
+    def test_list_queries_do_not_depend_on_page_size(self):
+        for client, queries in (
+            (self.anonymous_client, 4),
+            (self.user_client, 6),
+        ):
+            for limit in (1, 6):
+                with self.subTest(client=client, limit=limit):
+                    cache.clear()
+                    token_cache.local.items.clear()
+                    with self.assertNumQueries(queries):
+                        response = client.get(
+                            "/api/recipes/", {"limit": limit}
+                        )
+                    self.assertEqual(response.status_code, 200)
+                    self.assertEqual(len(response.data["results"]), limit)
+
+    def test_detail_queries(self):
+        url = f"/api/recipes/{self.recipes[0].id}/"
+        for client, queries in (
+            (self.anonymous_client, 3),
+            (self.user_client, 5),
+        ):
+            with self.subTest(client=client):
+                with self.assertNumQueries(queries):
+                    response = client.get(url)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(len(response.data["ingredients"]), 3)
+
+
+class CounterTests(APITestCase):
+    def assertCounters(self, instance, **counters):
+        instance.refresh_from_db(fields=list(counters))
+        for field, value in counters.items():
+            self.assertEqual(getattr(instance, field), value, field)
+
+    def test_favorite_and_cart_counters(self):
+        recipe = self.recipes[0]
+        for action, counter in (
+            ("favorite", "favorites_count"),
+            ("shopping_cart", "cart_count"),
+        ):
+            with self.subTest(action=action):
+                url = f"/api/recipes/{recipe.id}/{action}/"
+                self.assertEqual(self.user_client.post(url).status_code, 201)
+                self.assertEqual(self.user_client.post(url).status_code, 400)
+                self.assertCounters(recipe, **{counter: 1})
+                response = self.user_client.delete(url)
+                self.assertEqual(response.status_code, 204)
+                response = self.user_client.delete(url)
+                self.assertEqual(response.status_code, 400)
+                self.assertCounters(recipe, **{counter: 0})
+
+    def test_recipe_and_subscriber_counters(self):
+        self.assertCounters(self.author, recipes_count=8)
+        url = f"/api/users/{self.author.id}/subscribe/"
+        self.assertEqual(self.user_client.post(url).status_code, 201)
+        self.assertCounters(self.author, subscribers_count=1)
+        self.assertEqual(self.user_client.delete(url).status_code, 204)
+        self.assertCounters(self.author, subscribers_count=0)
+        response = self.get_client(self.author).delete(
+            f"/api/recipes/{self.recipes[0].id}/"
+        )
+        self.assertEqual(response.status_code, 204)
+        self.assertCounters(self.author, recipes_count=7)
+
+    def test_recount_repairs_counters(self):
+        recipe = self.recipes[0]
+        Favorite.objects.create(user=self.user, recipe=recipe)
+        Recipe.objects.update(favorites_count=5, cart_count=3)
+        User.objects.update(recipes_count=0, subscribers_count=2)
+        call_command("recount", verbosity=0)
+        self.assertCounters(recipe, favorites_count=1, cart_count=0)
+        self.assertCounters(self.author, recipes_count=8, subscribers_count=0)
+
+
+class RecipeUpdateTests(APITestCase):
+    def test_update_diffs_ingredients_and_tags(self):
+        recipe = self.recipes[0]
+        first, second, removed, added = self.ingredients[:4]
+        rows = {
+            row.ingredient_id: row.pk
+            for row in RecipeIngredient.objects.filter(recipe=recipe)
+        }
+        tag_row = RecipeTag.objects.get(recipe=recipe, tag=self.tags[0]).pk
+        response = self.get_client(self.author).patch(
+            f"/api/recipes/{recipe.id}/",
+            {
+                "ingredients": [
+                    {"id": first.id, "amount": 1},
+                    {"id": second.id, "amount": 50},
+                    {"id": added.id, "amount": 7},
+                ],
+                "tags": [self.tags[0].id],
+            },
+            format="json",
+        )
+        self.assertEqual(response.status_code, 200)
+        current = {
+            row.ingredient_id: row
+            for row in RecipeIngredient.objects.filter(recipe=recipe)
+        }
+        self.assertEqual(set(current), {first.id, second.id, added.id})
+        self.assertEqual(current[first.id].pk, rows[first.id])
+        self.assertEqual(current[second.id].pk, rows[second.id])
+        self.assertEqual(current[second.id].amount, 50)
+        self.assertEqual(current[added.id].amount, 7)
+        self.assertNotIn(removed.id, current)
+        self.assertEqual(
+            list(RecipeTag.objects.filter(recipe=recipe).values_list("pk")),
+            [(tag_row,)],
+        )
+        self.assertEqual(
+            sorted(item["amount"] for item in response.data["ingredients"]),
+            [1, 7, 50],
+        )
+
+
+class UserRecipeWriteTests(APITestCase):
+    def test_favorite_write_queries(self):
+        url = f"/api/recipes/{self.recipes[0].id}/favorite/"
+        self.user_client.get("/api/users/me/")
+        with self.assertNumQueries(5):
+            response = self.user_client.post(url)
+        self.assertEqual(response.status_code, 201)
+        with self.assertNumQueries(4):
+            response = self.user_client.delete(url)
+        self.assertEqual(response.status_code, 204)
+
+    def test_missing_recipe(self):
+        for method in ("post", "delete"):
+            with self.subTest(method=method):
+                response = getattr(self.user_client, method)(
+                    "/api/recipes/999/shopping_cart/"
+                )
+                self.assertEqual(response.status_code, 404)
+
+    def test_shopping_cart_batch(self):
+        kept, removed, *added = [recipe.id for recipe in self.recipes[:5]]
+        ShoppingCart.objects.bulk_create(
+            [
+                ShoppingCart(user=self.user, recipe_id=recipe_id)
+                for recipe_id in (kept, removed)
+            ]
+        )
+        response = self.user_client.post(
+            "/api/recipes/shopping_cart/batch/",
+            {"add": [kept, *added], "remove": [removed, 999]},
+            format="json",
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, {"added": 3, "removed": 1})
+        self.assertEqual(
+            set(
+                ShoppingCart.objects.filter(user=self.user).values_list(
+                    "recipe_id", flat=True
+                )
+            ),
+            {kept, *added},
+        )
+
+
+class UserRecipeBulkTests(APITestCase):
+    def test_import_export_and_clear(self):
+        recipe_ids = [recipe.id for recipe in self.recipes[:4]]
+        Favorite.objects.create(user=self.user, recipe_id=recipe_ids[0])
+        response = self.user_client.post(
+            "/api/recipes/favorite/bulk/",
+            {"recipes": recipe_ids},
+            format="json",
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data, {"added": 3})
+        response = self.user_client.get("/api/recipes/favorite/bulk/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(sorted(response.data["recipes"]), sorted(recipe_ids))
+        self.assertEqual(
+            list(
+                Recipe.objects.filter(pk__in=recipe_ids).values_list(
+                    "favorites_count", flat=True
+                )
+            ),
+            [1] * 4,
+        )
+        response = self.user_client.delete("/api/recipes/favorite/")
+        self.assertEqual(response.status_code, 204)
+        self.assertFalse(Favorite.objects.filter(user=self.user).exists())
+        self.assertFalse(Recipe.objects.filter(favorites_count__gt=0).exists())
+
+    def test_import_rejects_unknown_recipes(self):
+        response = self.user_client.post(
+            "/api/recipes/shopping_cart/bulk/",
+            {"recipes": [self.recipes[0].id, 999]},
+            format="json",
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(ShoppingCart.objects.filter(user=self.user).exists())
+
+    def test_clear_does_not_decrement_twice(self):
+        recipe = self.recipes[0]
+        ShoppingCart.objects.create(user=self.user, recipe=recipe)
+        Recipe.objects.filter(pk=recipe.pk).update(cart_count=2)
+        for _ in range(2):
+            response = self.user_client.delete("/api/recipes/shopping_cart/")
+            self.assertEqual(response.status_code, 204)
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.cart_count, 1)
+
+
+class TokenCacheTests(APITestCase):
+    def test_cached_lookup_skips_token_query(self):
+        response = self.user_client.get("/api/users/me/")
+        self.assertEqual(response.status_code, 200)
+        with self.assertNumQueries(0):
+            response = self.user_client.get("/api/users/me/")
+        self.assertEqual(response.data["email"], self.user.email)
+
+    @override_settings(TOKEN_CACHE_SHARED=True)
+    def test_cache_does_not_store_password(self):
+        self.user_client.get("/api/users/me/")
+        for data in (
+            token_cache.local.get(self.token.key),
+            cache.get(token_cache.get_shared_key(self.token.key)),
+        ):
+            self.assertNotIn("password", data[-1])
+        token_cache.local.items.clear()
+        with self.assertNumQueries(0):
+            response = self.user_client.get("/api/users/me/")
+        self.assertEqual(response.status_code, 200)
+
+    def test_logout_invalidates_cached_token(self):
+        self.user_client.get("/api/users/me/")
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.user_client.post("/api/auth/token/logout/")
+        self.assertEqual(response.status_code, 204)
+        response = self.user_client.get("/api/users/me/")
+        self.assertEqual(response.status_code, 401)
+
+    def test_deactivation_invalidates_cached_token(self):
+        self.user_client.get("/api/users/me/")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.is_active = False
+            self.user.save()
+        response = self.user_client.get("/api/users/me/")
+        self.assertEqual(response.status_code, 401)
+
+
+class ShoppingListCacheTests(APITestCase):
+    url = "/api/recipes/shopping_cart/"
+
+    def get_amounts(self):
+        response = self.user_client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        return {
+            item["name"]: item["amount"]
+            for item in response.data["ingredients"]
+        }
+
+    def test_cart_and_recipe_changes_invalidate_list(self):
+        recipe = self.recipes[0]
+        names = [ingredient.name for ingredient in self.ingredients]
+        self.assertEqual(self.get_amounts(), {})
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user_client.post(f"/api/recipes/{recipe.id}/shopping_cart/")
+        self.assertEqual(self.get_amounts(), dict.fromkeys(names[:3], 1))
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.get_client(self.author).patch(
+                f"/api/recipes/{recipe.id}/",
+                {
+                    "ingredients": [
+                        {"id": self.ingredients[0].id, "amount": 9}
+                    ],
+                    "tags": [self.tags[0].id],
+                },
+                format="json",
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.get_amounts(), {names[0]: 9})
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user_client.delete(f"/api/recipes/{recipe.id}/shopping_cart/")
+        self.assertEqual(self.get_amounts(), {})
+
+    def test_list_computed_before_invalidation_is_not_served(self):
+        aggregate = shopping_list.aggregate_shopping_list
+
+        def changed_while_computing(user):
+            shopping_list.bump_versions(
+                [shopping_list.get_version_key(user.id)]
+            )
+            return aggregate(user)
+
+        with mock.patch.object(
+            shopping_list,
+            "aggregate_shopping_list",
+            side_effect=changed_while_computing,
+        ) as aggregate_mock:
+            shopping_list.get_shopping_list(self.user)
+            shopping_list.get_shopping_list(self.user)
+        self.assertEqual(aggregate_mock.call_count, 2)
+
+
+class ConditionalListTests(APITestCase):
+    def test_list_validators_follow_deletions(self):
+        response = self.anonymous_client.get("/api/tags/")
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn("Last-Modified", response)
+        etag = response["ETag"]
+        response = self.anonymous_client.get(
+            "/api/tags/", HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(response.status_code, 304)
+        self.tags[1].delete()
+        for headers in (
+            {"HTTP_IF_NONE_MATCH": etag},
+            {"HTTP_IF_MODIFIED_SINCE": "Fri, 01 Jan 2100 00:00:00 GMT"},
+        ):
+            with self.subTest(headers=headers):
+                response = self.anonymous_client.get("/api/tags/", **headers)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(len(response.data), 1)
+
+
+class Base64ImageFieldTests(TestCase):
+    def setUp(self):
+        buffer = BytesIO()
+        Image.new("RGB", (40, 40), "red").save(buffer, "PNG")
+        self.encoded = base64.b64encode(buffer.getvalue()).decode()
+
+    def test_accepts_line_wrapped_base64(self):
+        lines = [
+            self.encoded[start:start + 76]
+            for start in range(0, len(self.encoded), 76)
+        ]
+        for separator in ("\n", "\r\n"):
+            with self.subTest(separator=separator):
+                image = Base64ImageField().to_internal_value(
+                    f"data:image/png;base64,{separator.join(lines)}"
+                )
+                self.assertEqual(image.content_type, "image/png")
+                image.close()
+
+    def test_rejects_invalid_base64(self):
+        with self.assertRaises(ValidationError):
+            Base64ImageField().to_internal_value(
+                f"data:image/png;base64,{self.encoded[:8]}!{self.encoded[8:]}"
+            )
+
+
+class IngredientFilterTests(APITestCase):
+    def test_name_filter_matches_prefix(self):
+        unit = self.ingredients[0].measurement_unit
+        for name in ("Молоко", "мол", "Молоко 🥛", "Масло", "Омолаживатель"):
+            Ingredient.objects.create(name=name, measurement_unit=unit)
+        response = self.anonymous_client.get(
+            "/api/ingredients/", {"name": "МОЛ"}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            sorted(item["name"] for item in response.data),
+            ["Молоко", "Молоко 🥛", "мол"],
+        )
+
+
+class ShoppingListDownloadTests(APITestCase):
+    url = "/api/recipes/download_shopping_cart/"
+
+    def test_download_formats(self):
+        ShoppingCart.objects.create(user=self.user, recipe=self.recipes[0])
+        for file_format, content_type in (
+            ("txt", "text/plain"),
+            ("csv", "text/csv"),
+            ("json", "application/json"),
+        ):
+            with self.subTest(format=file_format):
+                response = self.user_client.get(
+                    self.url, {"format": file_format}
+                )
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(
+                    response["Content-Type"], f"{content_type}; charset=utf-8"
+                )
+                self.assertIn(
+                    f"shopping_list.{file_format}",
+                    response["Content-Disposition"],
+                )
+                self.assertIn(
+                    self.ingredients[0].name, response.content.decode()
+                )
+
+    def test_errors_are_sent_as_json(self):
+        for client, params, status_code in (
+            (self.anonymous_client, {}, 401),
+            (self.anonymous_client, {"format": "csv"}, 401),
+            (self.user_client, {"format": "pdf"}, 404),
+        ):
+            with self.subTest(params=params, status_code=status_code):
+                response = client.get(self.url, params)
+                self.assertEqual(response.status_code, status_code)
+                self.assertEqual(response["Content-Type"], "application/json")
+                self.assertIn("detail", response.json())
@@ -1,17 +1,32 @@
 from django.contrib.auth import get_user_model
-from django.db.models import Sum
-from django.http import FileResponse
-from django.shortcuts import get_object_or_404
+from django.db import transaction
+from django.db.models import (
+    Count,
+    F,
+    FloatField,
+    OuterRef,
+    Prefetch,
+    Q,
+    Subquery,
+)
+from django.db.models.functions import Cast
 from django_filters.rest_framework import DjangoFilterBackend
 from djoser.views import UserViewSet
 from rest_framework import status, viewsets
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.generics import get_object_or_404
+from rest_framework.parsers import FormParser, JSONParser, MultiPartParser
 from rest_framework.permissions import (
     IsAuthenticated,
     IsAuthenticatedOrReadOnly,
 )
+from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
+from rest_framework.settings import api_settings
 
+from constants import Autocomplete, HttpCache
+from recipes.autocomplete import ingredient_index
 from recipes.models import (
     Favorite,
     Ingredient,
@@ -20,37 +35,67 @@ from recipes.models import (
     ShoppingCart,
     Tag,
 )
+from recipes.shopping_list import get_shopping_list
+from recipes.user_recipes import add_user_recipes, remove_user_recipes
 from users.models import Subscription
 
 from .filterts import IngredientFilter, RecipesFilter
-from .pagination import CustomPageNumberPagination
+from .mixins import (
+    ConditionalListMixin,
+    ConditionalRetrieveMixin,
+    RelationshipsMixin,
+    ReplicaReadMixin,
+)
+from .pagination import FeedPagination
 from .permissions import IsAuthenticatedAuthorOrReadOnly
+from .renderers import (
+    ShoppingListCSVRenderer,
+    ShoppingListRenderer,
+    ShoppingListJSONRenderer,
+    ShoppingListTextRenderer,
+)
 from .serializers import (
     CustomUserSerializer,
-    FavoritesSerializer,
     IngredientsSerializer,
+    PantryRecipesSerializer,
+    PantrySerializer,
     RecipesReadSerializer,
+    RecipesShortSerializer,
     RecipesWriteSerializer,
-    ShoppingCartSerializer,
+    ShoppingListSerializer,
     SubscriptionsSerializer,
     TagsSerializer,
+    UserRecipesBatchSerializer,
+    UserRecipesBulkSerializer,
 )
 
 User = get_user_model()
 
 
-class CustomUserViewSet(UserViewSet):
+class CustomUserViewSet(RelationshipsMixin, UserViewSet):
     queryset = User.objects.all()
     serializer_class = CustomUserSerializer
     permission_classes = [IsAuthenticatedOrReadOnly]
-    pagination_class = CustomPageNumberPagination
+    pagination_class = FeedPagination
+
+    def get_recipes_limit(self):
+        try:
+            recipes_limit = int(self.request.query_params["recipes_limit"])
+        except (KeyError, ValueError):
+            return None
+        return recipes_limit if recipes_limit > 0 else None
 
     @action(["post"], detail=True, permission_classes=[IsAuthenticated])
     def subscribe(self, request, id=None):
         author = self.get_object()
         serializer = SubscriptionsSerializer(
             data=request.data,
-            context={"request": request, "author": author},
+            context={
+                "request": request,
+                "relationships": self.relationships,
+                "author": author,
+                "recipes_limit": self.get_recipes_limit(),
+            },
         )
         serializer.is_valid(raise_exception=True)
         serializer.save(author=author, user=request.user)
@@ -70,36 +115,131 @@ class CustomUserViewSet(UserViewSet):
 
     @action(["get"], detail=False, permission_classes=[IsAuthenticated])
     def subscriptions(self, request):
-        queryset = User.objects.filter(subscribers__user=request.user)
+        recipes_limit = self.get_recipes_limit()
+        recipes = Recipe.objects.all()
+        if recipes_limit:
+            recipes = recipes.filter(
+                pk__in=Subquery(
+                    Recipe.objects.filter(author=OuterRef("author"))
+                    .order_by("-id")
+                    .values("pk")[:recipes_limit]
+                )
+            )
+        queryset = User.objects.filter(
+            subscribers__user=request.user
+        ).prefetch_related(Prefetch("recipes", queryset=recipes))
         pages = self.paginate_queryset(queryset)
         serializer = SubscriptionsSerializer(
-            pages, many=True, context={"request": request}
+            pages,
+            many=True,
+            context={
+                "request": request,
+                "relationships": self.relationships,
+                "recipes_limit": recipes_limit,
+            },
         )
         return self.get_paginated_response(serializer.data)
 
 
-class TagsViewSet(viewsets.ReadOnlyModelViewSet):
+class TagsViewSet(
+    ReplicaReadMixin, ConditionalListMixin, viewsets.ReadOnlyModelViewSet
+):
     queryset = Tag.objects.all()
     serializer_class = TagsSerializer
     permission_classes = [IsAuthenticatedOrReadOnly]
+    cache_control = {
+        "public": True,
+        "max_age": HttpCache.REFERENCE_MAX_AGE.value,
+    }
 
 
-class IngredientsViewSet(viewsets.ReadOnlyModelViewSet):
+class IngredientsViewSet(
+    ReplicaReadMixin, ConditionalListMixin, viewsets.ReadOnlyModelViewSet
+):
     queryset = Ingredient.objects.all()
     serializer_class = IngredientsSerializer
     permission_classes = [IsAuthenticatedOrReadOnly]
+    cache_control = {
+        "public": True,
+        "max_age": HttpCache.REFERENCE_MAX_AGE.value,
+    }
     filter_backends = [DjangoFilterBackend]
     filterset_class = IngredientFilter
+    replica_actions = ["list", "retrieve", "autocomplete"]
+
+    @action(["get"], detail=False)
+    def autocomplete(self, request):
+        try:
+            limit = int(
+                request.query_params.get(
+                    "limit", Autocomplete.DEFAULT_LIMIT.value
+                )
+            )
+        except ValueError:
+            limit = Autocomplete.DEFAULT_LIMIT.value
+        limit = max(1, min(limit, Autocomplete.MAX_LIMIT.value))
+        return Response(
+            ingredient_index.search(
+                request.query_params.get("name", ""), limit
+            )
+        )
 
 
-class RecipesViewSet(viewsets.ModelViewSet):
+class RecipesViewSet(
+    ReplicaReadMixin,
+    RelationshipsMixin,
+    ConditionalRetrieveMixin,
+    viewsets.ModelViewSet,
+):
     queryset = Recipe.objects.all()
     permission_classes = [IsAuthenticatedAuthorOrReadOnly]
-    pagination_class = CustomPageNumberPagination
+    pagination_class = FeedPagination
     filter_backends = [DjangoFilterBackend]
     filterset_class = RecipesFilter
+    lookup_value_regex = r"\d+"
+    parser_classes = [JSONParser, MultiPartParser, FormParser]
+    cache_control = {"private": True, "no_cache": True}
+    vary_headers = ["Authorization"]
+
+    def get_queryset(self):
+        return self.queryset.select_related("author").prefetch_related(
+            Prefetch(
+                "recipe_ingredients",
+                queryset=RecipeIngredient.objects.select_related(
+                    "ingredient__measurement_unit"
+                ),
+            ),
+            "tags",
+        )
+
+    def get_object_validators(self, instance):
+        author = instance.author
+        related_modified = max(
+            [tag.updated_at for tag in instance.tags.all()]
+            + [
+                recipe_ingredient.ingredient.updated_at
+                for recipe_ingredient in instance.recipe_ingredients.all()
+            ],
+            default=None,
+        )
+        state = (
+            instance.pk,
+            instance.updated_at.timestamp(),
+            related_modified and related_modified.timestamp(),
+            self.relationships.is_favorited(instance),
+            self.relationships.is_in_shopping_cart(instance),
+            author.pk,
+            author.email,
+            author.username,
+            author.first_name,
+            author.last_name,
+            self.relationships.is_subscribed(author),
+        )
+        return state, None
 
     def get_serializer_class(self):
+        if self.action == "pantry":
+            return PantryRecipesSerializer
         if self.request.method == "GET":
             return RecipesReadSerializer
         return RecipesWriteSerializer
@@ -107,73 +247,195 @@ class RecipesViewSet(viewsets.ModelViewSet):
     def perform_create(self, serializer):
         serializer.save(author=self.request.user)
 
-    @action(["post"], detail=True, permission_classes=[IsAuthenticated])
-    def favorite(self, request, pk=None):
-        recipe = self.get_object()
-        serializer = FavoritesSerializer(
-            data=request.data,
-            context={"request": request, "recipe": recipe},
+    def add_user_recipe(self, model, error):
+        recipe = get_object_or_404(Recipe, pk=self.kwargs["pk"])
+        if not add_user_recipes(model, self.request.user, [recipe.pk]):
+            raise ValidationError({api_settings.NON_FIELD_ERRORS_KEY: [error]})
+        serializer = RecipesShortSerializer(
+            recipe, context=self.get_serializer_context()
         )
-        serializer.is_valid(raise_exception=True)
-        serializer.save(user=request.user, recipe=recipe)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
+    def remove_user_recipe(self, model, error):
+        pk = int(self.kwargs["pk"])
+        if not remove_user_recipes(model, self.request.user, [pk]):
+            get_object_or_404(Recipe, pk=pk)
+            raise ValidationError({api_settings.NON_FIELD_ERRORS_KEY: [error]})
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+    @action(["post"], detail=True, permission_classes=[IsAuthenticated])
+    def favorite(self, request, pk=None):
+        return self.add_user_recipe(Favorite, "Рецепт уже в избранном.")
+
     @favorite.mapping.delete
     def delete_favorite(self, request, pk=None):
-        recipe = self.get_object()
-        serializer = FavoritesSerializer(
-            recipe, data=request.data, context={"request": request}
-        )
-        serializer.is_valid(raise_exception=True)
-        get_object_or_404(Favorite, user=request.user, recipe=recipe).delete()
-        return Response(status=status.HTTP_204_NO_CONTENT)
+        return self.remove_user_recipe(Favorite, "Рецепта нет в избранном.")
 
     @action(["post"], detail=True, permission_classes=[IsAuthenticated])
     def shopping_cart(self, request, pk=None):
-        recipe = self.get_object()
-        serializer = ShoppingCartSerializer(
-            data=request.data,
-            context={"request": request, "recipe": recipe},
+        return self.add_user_recipe(
+            ShoppingCart, "Рецепт уже в списке покупок."
         )
-        serializer.is_valid(raise_exception=True)
-        serializer.save(user=request.user, recipe=recipe)
-        return Response(serializer.data, status=status.HTTP_201_CREATED)
 
     @shopping_cart.mapping.delete
     def delete_shopping_cart(self, request, pk=None):
-        recipe = self.get_object()
-        serializer = ShoppingCartSerializer(
-            recipe, data=request.data, context={"request": request}
+        return self.remove_user_recipe(
+            ShoppingCart, "Рецепта нет в списке покупок."
         )
+
+    def export_user_recipes(self, model):
+        recipes = (
+            model.objects.filter(user=self.request.user)
+            .order_by("-id")
+            .values_list("recipe_id", flat=True)
+        )
+        return Response({"recipes": list(recipes)})
+
+    def import_user_recipes(self, model):
+        serializer = UserRecipesBulkSerializer(data=self.request.data)
         serializer.is_valid(raise_exception=True)
-        get_object_or_404(
-            ShoppingCart, user=request.user, recipe=recipe
-        ).delete()
+        added = add_user_recipes(
+            model,
+            self.request.user,
+            [recipe.pk for recipe in serializer.validated_data["recipes"]],
+        )
+        return Response(
+            {"added": added},
+            status=status.HTTP_201_CREATED if added else status.HTTP_200_OK,
+        )
+
+    def clear_user_recipes(self, model):
+        remove_user_recipes(model, self.request.user)
         return Response(status=status.HTTP_204_NO_CONTENT)
 
-    @action(detail=False, permission_classes=[IsAuthenticated])
+    @action(
+        ["get"],
+        detail=False,
+        url_path="favorite/bulk",
+        url_name="favorite-bulk",
+        permission_classes=[IsAuthenticated],
+    )
+    def favorite_bulk(self, request):
+        return self.export_user_recipes(Favorite)
+
+    @favorite_bulk.mapping.post
+    def import_favorites(self, request):
+        return self.import_user_recipes(Favorite)
+
+    @action(
+        ["delete"],
+        detail=False,
+        url_path="favorite",
+        url_name="favorite-clear",
+        permission_classes=[IsAuthenticated],
+    )
+    def clear_favorites(self, request):
+        return self.clear_user_recipes(Favorite)
+
+    @action(
+        ["get"],
+        detail=False,
+        url_path="shopping_cart/bulk",
+        url_name="shopping-cart-bulk",
+        permission_classes=[IsAuthenticated],
+    )
+    def shopping_cart_bulk(self, request):
+        return self.export_user_recipes(ShoppingCart)
+
+    @shopping_cart_bulk.mapping.post
+    def import_shopping_cart(self, request):
+        return self.import_user_recipes(ShoppingCart)
+
+    @action(
+        ["post"],
+        detail=False,
+        url_path="shopping_cart/batch",
+        url_name="shopping-cart-batch",
+        permission_classes=[IsAuthenticated],
+    )
+    def shopping_cart_batch(self, request):
+        serializer = UserRecipesBatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        with transaction.atomic():
+            added = add_user_recipes(
+                ShoppingCart,
+                request.user,
+                [recipe.pk for recipe in serializer.validated_data["add"]],
+            )
+            removed = remove_user_recipes(
+                ShoppingCart, request.user, serializer.validated_data["remove"]
+            )
+        return Response({"added": added, "removed": removed})
+
+    @action(["get"], detail=False)
+    def pantry(self, request):
+        serializer = PantrySerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        matched = Q(
+            recipe_ingredients__ingredient__in=set(
+                serializer.validated_data["ingredients"]
+            )
+        )
+        queryset = (
+            self.filter_queryset(self.get_queryset())
+            .annotate(
+                matched_count=Count(
+                    "recipe_ingredients", filter=matched, distinct=True
+                ),
+                ingredients_count=Count("recipe_ingredients", distinct=True),
+            )
+            .filter(matched_count__gt=0)
+            .annotate(
+                coverage=Cast("matched_count", FloatField())
+                / F("ingredients_count")
+            )
+            .order_by("-coverage", "-matched_count", "-id")
+        )
+        page = self.paginate_queryset(queryset)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
+    @action(
+        ["get"],
+        detail=False,
+        url_path="shopping_cart",
+        url_name="shopping-cart-summary",
+        permission_classes=[IsAuthenticated],
+    )
+    def shopping_cart_summary(self, request):
+        serializer = ShoppingListSerializer(get_shopping_list(request.user))
+        return Response(serializer.data)
+
+    @shopping_cart_summary.mapping.delete
+    def clear_shopping_cart(self, request):
+        return self.clear_user_recipes(ShoppingCart)
+
+    @action(
+        detail=False,
+        permission_classes=[IsAuthenticated],
+        renderer_classes=[
+            ShoppingListTextRenderer,
+            ShoppingListCSVRenderer,
+            ShoppingListJSONRenderer,
+        ],
+    )
     def download_shopping_cart(self, request):
         user = request.user
-        ingredients = (
-            RecipeIngredient.objects.filter(
-                recipe__shoppingcart__user=request.user
-            )
-            .values("ingredient__name", "ingredient__measurement_unit__name")
-            .annotate(amount=Sum("amount"))
-        )
-        shopping_list = "Список покупок\n\n"
-        shopping_list += "\n".join(
-            [
-                (
-                    f'- {ingredient["ingredient__name"]} '
-                    f'({ingredient["ingredient__measurement_unit__name"]})'
-                    f' - {ingredient["amount"]}'
-                )
-                for ingredient in ingredients
-            ]
+        renderer = request.accepted_renderer
+        response = Response(get_shopping_list(user)["ingredients"])
+        response["Content-Disposition"] = (
+            "attachment; "
+            f"filename={user.username}_shopping_list.{renderer.format}"
+        )
+        return response
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(
+            request, response, *args, **kwargs
         )
-        response = FileResponse(shopping_list, content_type="txt")
-        response[
-            "Content-Disposition"
-        ] = f"attachment; filename={user.username}_shopping_list.txt"
+        if getattr(response, "exception", False) and isinstance(
+            response.accepted_renderer, ShoppingListRenderer
+        ):
+            response.accepted_renderer = JSONRenderer()
+            response.accepted_media_type = JSONRenderer.media_type
         return response
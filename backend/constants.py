@@ -1,8 +1,10 @@
+from datetime import datetime, timezone
 from enum import Enum
 
 
 class Pagination(Enum):
     PAGE_SIZE = 6
+    MAX_PAGE_SIZE = 100
 
 
 class RecipesModels(Enum):
@@ -17,3 +19,81 @@ class RecipesModels(Enum):
 class UsersModels(Enum):
     MAX_LEN_USER_FIRST_NAME = 150
     MAX_LEN_USER_LAST_NAME = 150
+
+
+class ShoppingList(Enum):
+    CACHE_KEY = "shopping_list:{}:{}"
+    VERSION_CACHE_KEY = "shopping_list:{}:version"
+    CACHE_TIMEOUT = 60 * 60 * 24
+    UNIT_CONVERSIONS = {"кг": ("г", 1000), "л": ("мл", 1000)}
+
+
+class Autocomplete(Enum):
+    DEFAULT_LIMIT = 10
+    MAX_LIMIT = 50
+    INDEX_CHECK_INTERVAL = 30
+
+
+class Tags(Enum):
+    INDEX_CHECK_INTERVAL = 30
+    MATCH_ANY = "any"
+    MATCH_ALL = "all"
+
+
+class Relationships(Enum):
+    CACHE_KEY = "relationships:{}:{}"
+    VERSION_CACHE_KEY = "relationships:{}:version"
+
+
+class Auth(Enum):
+    TOKEN_CACHE_KEY = "auth:token:{}"
+    TOKEN_CACHE_USER_FIELDS = (
+        "id",
+        "email",
+        "username",
+        "first_name",
+        "last_name",
+        "is_active",
+        "is_staff",
+        "is_superuser",
+    )
+
+
+class HttpCache(Enum):
+    REFERENCE_MAX_AGE = 60 * 10
+
+
+class Trending(Enum):
+    EPOCH = datetime(2023, 1, 1, tzinfo=timezone.utc)
+    DECAY_SECONDS = 60 * 60 * 24 * 2
+    WATERMARK_CACHE_KEY = "trending:last_favorite_id"
+    BATCH_SIZE = 1000
+
+
+class RecipeImages(Enum):
+    UPLOAD_TO = "recipes/images/"
+    SIZES = {"small": 320, "medium": 960}
+    JPEG_QUALITY = 85
+    WEBP_QUALITY = 80
+    MAX_UPLOAD_SIZE = 20 * 1024 * 1024
+    DECODE_CHUNK_SIZE = 64 * 1024
+    SIGNATURES = [
+        (0, b"\xff\xd8\xff", "jpg", "image/jpeg"),
+        (0, b"\x89PNG\r\n\x1a\n", "png", "image/png"),
+        (0, b"GIF87a", "gif", "image/gif"),
+        (0, b"GIF89a", "gif", "image/gif"),
+        (8, b"WEBP", "webp", "image/webp"),
+    ]
+
+
+class Search(Enum):
+    CONFIG = "russian"
+    FTS_TABLE = "recipes_recipe_fts"
+
+
+class Pantry(Enum):
+    MAX_INGREDIENTS = 100
+
+
+class UserRecipes(Enum):
+    MAX_BATCH_SIZE = 100
@@ -0,0 +1,59 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connections
+
+REPLICA = "replica"
+
+read_from_replica = ContextVar("read_from_replica", default=False)
+
+
+@contextmanager
+def replica_reads(enabled=True):
+    token = read_from_replica.set(enabled)
+    try:
+        yield
+    finally:
+        read_from_replica.reset(token)
+
+
+class ReplicaRouter:
+    replica_apps = {"recipes"}
+    primary_models = {"recipes.favorite", "recipes.shoppingcart"}
+
+    def db_for_read(self, model, **hints):
+        if (
+            read_from_replica.get()
+            and REPLICA in settings.DATABASES
+            and model._meta.app_label in self.replica_apps
+            and model._meta.label_lower not in self.primary_models
+        ):
+            return REPLICA
+        return None
+
+    def db_for_write(self, model, **hints):
+        return None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, **hints):
+        if db == REPLICA:
+            return False
+        return None
+
+
+class ConnectionHealthCheckMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        for connection in connections.all():
+            if (
+                connection.connection is not None
+                and connection.settings_dict.get("CONN_HEALTH_CHECKS")
+                and not connection.is_usable()
+            ):
+                connection.close()
+        return self.get_response(request)
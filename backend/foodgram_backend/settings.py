@@ -30,6 +30,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "foodgram_backend.db.ConnectionHealthCheckMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -59,10 +60,53 @@ TEMPLATES = [
 
 WSGI_APPLICATION = "foodgram_backend.wsgi.application"
 
-DATABASES = {
+if os.getenv("POSTGRES_DB"):
+    DATABASES = {
+        "default": {
+            "ENGINE": "django.db.backends.postgresql",
+            "NAME": os.getenv("POSTGRES_DB"),
+            "USER": os.getenv("POSTGRES_USER", "foodgram_user"),
+            "PASSWORD": os.getenv("POSTGRES_PASSWORD", ""),
+            "HOST": os.getenv("DB_HOST", "db"),
+            "PORT": int(os.getenv("DB_PORT", 5432)),
+            "CONN_MAX_AGE": int(os.getenv("DB_CONN_MAX_AGE", 60)),
+            "CONN_HEALTH_CHECKS": os.getenv(
+                "DB_CONN_HEALTH_CHECKS", "True"
+            ).lower() in ("true", "1", "t"),
+            "DISABLE_SERVER_SIDE_CURSORS": os.getenv(
+                "DB_DISABLE_SERVER_SIDE_CURSORS", "False"
+            ).lower() in ("true", "1", "t"),
+            "OPTIONS": {
+                "options": "-c statement_timeout={}".format(
+                    int(os.getenv("DB_STATEMENT_TIMEOUT", 0))
+                ),
+            },
+        }
+    }
+    if os.getenv("DB_REPLICA_HOST"):
+        DATABASES["replica"] = {
+            **DATABASES["default"],
+            "HOST": os.getenv("DB_REPLICA_HOST"),
+            "PORT": int(os.getenv("DB_REPLICA_PORT", 5432)),
+            "TEST": {"MIRROR": "default"},
+        }
+else:
+    DATABASES = {
+        "default": {
+            "ENGINE": "django.db.backends.sqlite3",
+            "NAME": BASE_DIR / "db.sqlite3",
+        }
+    }
+
+DATABASE_ROUTERS = ["foodgram_backend.db.ReplicaRouter"]
+
+CACHES = {
     "default": {
-        "ENGINE": "django.db.backends.sqlite3",
-        "NAME": BASE_DIR / "db.sqlite3",
+        "BACKEND": os.getenv(
+            "CACHE_BACKEND",
+            "django.core.cache.backends.filebased.FileBasedCache",
+        ),
+        "LOCATION": os.getenv("CACHE_LOCATION", "/tmp/foodgram_cache"),
     }
 }
 
@@ -97,11 +141,24 @@ STATIC_ROOT = BASE_DIR / "static/"
 MEDIA_URL = "/media/"
 MEDIA_ROOT = BASE_DIR.parent / "media/"
 
+IMAGE_PROCESSING_WORKERS = int(os.getenv("IMAGE_PROCESSING_WORKERS", 2))
+
+RELATIONSHIPS_CACHE_TIMEOUT = int(
+    os.getenv("RELATIONSHIPS_CACHE_TIMEOUT", 300)
+)
+
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", 1024))
+TOKEN_CACHE_TIMEOUT = int(os.getenv("TOKEN_CACHE_TIMEOUT", 60))
+TOKEN_CACHE_LOCAL_TIMEOUT = int(os.getenv("TOKEN_CACHE_LOCAL_TIMEOUT", 5))
+TOKEN_CACHE_SHARED = os.getenv("TOKEN_CACHE_SHARED", "False").lower() in (
+    "true", "1", "t"
+)
+
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": [
-        "rest_framework.authentication.TokenAuthentication",
+        "api.authentication.CachingTokenAuthentication",
     ],
     "DEFAULT_PERMISSION_CLASSES": [
         "rest_framework.permissions.IsAuthenticated",
@@ -39,9 +39,10 @@ class RecipeAdmin(admin.ModelAdmin):
     readonly_fields = ["favorites_added"]
 
     def favorites_added(self, obj):
-        return obj.favorites.all().count()
+        return obj.favorites_count
 
     favorites_added.short_description = "Количество добавлений в избранное"
+    favorites_added.admin_order_field = "favorites_count"
 
 
 class RecipeTagAdmin(admin.ModelAdmin):
@@ -0,0 +1,82 @@
+from constants import Autocomplete
+
+from .indexes import ModelIndex
+from .models import Ingredient
+
+
+class IngredientTrie:
+    def __init__(self):
+        self.root = {}
+        self.ingredients = []
+
+    @classmethod
+    def from_queryset(cls, queryset):
+        trie = cls()
+        for ingredient in queryset:
+            trie.insert(
+                ingredient.search_name,
+                {
+                    "id": ingredient.id,
+                    "name": ingredient.name,
+                    "measurement_unit": ingredient.measurement_unit.name,
+                },
+            )
+        return trie
+
+    def insert(self, key, ingredient):
+        node = self.root
+        for char in key:
+            node = node.setdefault(char, {})
+        node.setdefault(None, []).append(ingredient)
+        self.ingredients.append((key, ingredient))
+
+    def startswith(self, prefix):
+        node = self.root
+        for char in prefix:
+            node = node.get(char)
+            if node is None:
+                return
+        stack = [node]
+        while stack:
+            node = stack.pop()
+            yield from node.get(None, [])
+            stack.extend(
+                node[char]
+                for char in sorted(filter(None, node), reverse=True)
+            )
+
+    def search(self, query, limit):
+        query = query.lower()
+        result = []
+        for ingredient in self.startswith(query):
+            if len(result) == limit:
+                return result
+            result.append(ingredient)
+        for key, ingredient in self.ingredients:
+            if len(result) == limit:
+                break
+            if query in key and not key.startswith(query):
+                result.append(ingredient)
+        return result
+
+
+class IngredientIndex(ModelIndex):
+    model = Ingredient
+    check_interval = Autocomplete.INDEX_CHECK_INTERVAL.value
+
+    def build(self, queryset):
+        return IngredientTrie.from_queryset(
+            queryset.select_related("measurement_unit").order_by(
+                "search_name", "id"
+            )
+        )
+
+    def search(self, query, limit):
+        return self.get().search(query, limit)
+
+
+ingredient_index = IngredientIndex()
+
+
+def invalidate_ingredient_index():
+    ingredient_index.invalidate()
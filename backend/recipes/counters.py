@@ -0,0 +1,40 @@
+from django.contrib.auth import get_user_model
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from users.models import Subscription
+
+from .models import Favorite, Recipe, ShoppingCart
+
+User = get_user_model()
+
+
+def change_counter(model, pk, field, delta):
+    queryset = model.objects.filter(pk=pk)
+    if delta < 0:
+        queryset = queryset.filter(**{f"{field}__gte": -delta})
+    queryset.update(**{field: F(field) + delta})
+
+
+def count_subquery(model, field):
+    return Coalesce(
+        Subquery(
+            model.objects.filter(**{field: OuterRef("pk")})
+            .order_by()
+            .values(field)
+            .annotate(count=Count("pk"))
+            .values("count")
+        ),
+        0,
+    )
+
+
+def recount():
+    Recipe.objects.update(
+        favorites_count=count_subquery(Favorite, "recipe"),
+        cart_count=count_subquery(ShoppingCart, "recipe"),
+    )
+    User.objects.update(
+        recipes_count=count_subquery(Recipe, "author"),
+        subscribers_count=count_subquery(Subscription, "author"),
+    )
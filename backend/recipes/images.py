@@ -0,0 +1,151 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from hashlib import sha256
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connection
+from django.db.models import Q
+from django.utils import timezone
+from PIL import Image, ImageOps, features
+
+from constants import RecipeImages
+
+from .models import Recipe
+
+logger = logging.getLogger(__name__)
+
+executor = ThreadPoolExecutor(
+    max_workers=settings.IMAGE_PROCESSING_WORKERS,
+    thread_name_prefix="recipe-images",
+)
+
+
+def save_variant(image, digest, variant, image_format, written, **params):
+    extension = image_format.lower().replace("jpeg", "jpg")
+    name = (
+        f"{RecipeImages.UPLOAD_TO.value}{digest[:2]}/"
+        f"{digest}_{variant}.{extension}"
+    )
+    if default_storage.exists(name):
+        return name
+    buffer = BytesIO()
+    image.save(buffer, image_format, **params)
+    name = default_storage.save(name, ContentFile(buffer.getvalue()))
+    written.append(name)
+    return name
+
+
+def save_variants(image, digest, variant, formats, written):
+    return {
+        image_format.lower(): save_variant(
+            image, digest, variant, image_format, written, **params
+        )
+        for image_format, params in formats
+    }
+
+
+def variant_names(variants):
+    return {name for formats in variants.values() for name in formats.values()}
+
+
+def variants_are_current(recipe):
+    variants = recipe.image_variants
+    return (
+        set(variants) == {"original", *RecipeImages.SIZES.value}
+        and recipe.image.name in variants["original"].values()
+    )
+
+
+def delete_unreferenced(names, recipe_id):
+    for name in names:
+        if not (
+            Recipe.objects.exclude(pk=recipe_id)
+            .filter(Q(image=name) | Q(image_variants__icontains=name))
+            .exists()
+        ):
+            default_storage.delete(name)
+
+
+def process_recipe_image(recipe_id):
+    recipe = (
+        Recipe.objects.filter(pk=recipe_id)
+        .only("image", "image_variants")
+        .first()
+    )
+    if recipe is None or not recipe.image or variants_are_current(recipe):
+        return
+    source_name = recipe.image.name
+    processed = recipe.image_variants.get("original", {})
+    with recipe.image.open("rb") as file:
+        data = file.read()
+    digest = sha256(data).hexdigest()
+    with Image.open(BytesIO(data)) as source:
+        source.load()
+        image = ImageOps.exif_transpose(source)
+    has_alpha = "A" in image.getbands() or "transparency" in image.info
+    image = image.convert("RGBA" if has_alpha else "RGB")
+    if has_alpha:
+        image_format, params = "PNG", {"optimize": True}
+    else:
+        image_format, params = "JPEG", {
+            "quality": RecipeImages.JPEG_QUALITY.value,
+            "optimize": True,
+            "progressive": True,
+        }
+    formats = [(image_format, params)]
+    if features.check("webp"):
+        formats.append(
+            (
+                "WEBP",
+                {"quality": RecipeImages.WEBP_QUALITY.value, "method": 6},
+            )
+        )
+
+    written = []
+    try:
+        if source_name in processed.values():
+            original, variants = source_name, {"original": processed}
+        else:
+            variants = {
+                "original": save_variants(
+                    image, digest, "original", formats, written
+                )
+            }
+            original = variants["original"][image_format.lower()]
+        for size_name, size in RecipeImages.SIZES.value.items():
+            thumbnail = image.copy()
+            thumbnail.thumbnail((size, size), Image.LANCZOS)
+            variants[size_name] = save_variants(
+                thumbnail, digest, size_name, formats, written
+            )
+        updated = Recipe.objects.filter(
+            pk=recipe_id, image=source_name
+        ).update(
+            image=original, image_variants=variants, updated_at=timezone.now()
+        )
+    except Exception:
+        for name in written:
+            default_storage.delete(name)
+        raise
+    if updated:
+        delete_unreferenced(
+            ({source_name} | variant_names(recipe.image_variants))
+            - variant_names(variants),
+            recipe_id,
+        )
+
+
+def run_image_processing(recipe_id):
+    try:
+        process_recipe_image(recipe_id)
+    except Exception:
+        logger.exception("Не удалось обработать изображение %s", recipe_id)
+    finally:
+        connection.close()
+
+
+def schedule_image_processing(recipe_id):
+    executor.submit(run_image_processing, recipe_id)
@@ -0,0 +1,108 @@
+import csv
+import json
+import re
+from collections import Counter
+from itertools import islice
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+SEPARATOR = re.compile(r"[ \t\n\r]*(?:,[ \t\n\r]*)?")
+
+
+def batched(items, size):
+    iterator = iter(items)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def iter_json_array(file, chunk_size=64 * 1024):
+    decoder = json.JSONDecoder()
+    buffer = file.read(chunk_size).lstrip()
+    if not buffer.startswith("["):
+        raise CommandError("Ожидался JSON-массив.")
+    position = 1
+    while True:
+        position = SEPARATOR.match(buffer, position).end()
+        if buffer.startswith("]", position):
+            return
+        try:
+            item, end = decoder.raw_decode(buffer, position)
+        except json.JSONDecodeError:
+            end = None
+        if end is None or end == len(buffer):
+            chunk = file.read(chunk_size)
+            if chunk:
+                buffer = buffer[position:] + chunk
+                position = 0
+                continue
+            if end is None:
+                raise CommandError("Некорректный JSON-файл.")
+        yield item
+        position = end
+
+
+class BaseImportCommand(BaseCommand):
+    fields = []
+    success_message = "Импорт завершён"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "-p",
+            "--path",
+            action="store",
+            required=True,
+            help="Путь к файлу CSV или JSON",
+        )
+        parser.add_argument(
+            "-f",
+            "--format",
+            choices=["csv", "json"],
+            help="Формат файла, по умолчанию определяется по расширению",
+        )
+        parser.add_argument(
+            "-b",
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Размер пакета для записи в базу",
+        )
+
+    def get_format(self, options):
+        file_format = options["format"] or Path(options["path"]).suffix[1:]
+        if file_format not in ("csv", "json"):
+            raise CommandError("Поддерживаются только файлы CSV и JSON.")
+        return file_format
+
+    def read_rows(self, file, file_format):
+        if file_format == "json":
+            for item in iter_json_array(file):
+                yield {field: item[field] for field in self.fields}
+        else:
+            for row in csv.reader(file):
+                if row:
+                    yield dict(zip(self.fields, row))
+
+    def import_batch(self, rows, stats):
+        raise NotImplementedError(
+            "BaseImportCommand.import_batch() must be implemented."
+        )
+
+    def handle(self, *args, **options):
+        stats = Counter(inserted=0, updated=0, skipped=0)
+        with open(options["path"], encoding="utf8") as file:
+            rows = self.read_rows(file, self.get_format(options))
+            for batch in batched(rows, options["batch_size"]):
+                with transaction.atomic():
+                    self.import_batch(batch, stats)
+        self.write_stats(stats)
+
+    def write_stats(self, stats):
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{self.success_message}: добавлено {stats['inserted']}, "
+                f"обновлено {stats['updated']}, "
+                f"пропущено {stats['skipped']}."
+            )
+        )
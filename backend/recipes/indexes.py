@@ -0,0 +1,51 @@
+from threading import Lock
+from time import monotonic
+
+from django.db import router, transaction
+from django.db.models import Count, Max
+
+
+class ModelIndex:
+    model = None
+    check_interval = 30
+
+    def __init__(self):
+        self.data = None
+        self.version = None
+        self.current_version = None
+        self.checked_at = None
+        self.lock = Lock()
+
+    def get_queryset(self):
+        return self.model.objects.using(router.db_for_write(self.model))
+
+    def get_version(self):
+        now = monotonic()
+        if (
+            self.checked_at is None
+            or now - self.checked_at >= self.check_interval
+        ):
+            state = self.get_queryset().aggregate(
+                count=Count("pk"), last_modified=Max("updated_at")
+            )
+            self.current_version = (state["count"], state["last_modified"])
+            self.checked_at = now
+        return self.current_version
+
+    def build(self, queryset):
+        raise NotImplementedError("ModelIndex.build() must be implemented.")
+
+    def get(self):
+        version = self.get_version()
+        if self.data is None or version != self.version:
+            with self.lock:
+                if self.data is None or version != self.version:
+                    self.data = self.build(self.get_queryset())
+                    self.version = version
+        return self.data
+
+    def reset(self):
+        self.checked_at = None
+
+    def invalidate(self):
+        transaction.on_commit(self.reset)
@@ -1,44 +1,95 @@
-import csv
-
-from django.core.management.base import BaseCommand
+from django.core.management.base import CommandError
+from django.db import connection, transaction
 
+from recipes.autocomplete import invalidate_ingredient_index
+from recipes.importers import BaseImportCommand
 from recipes.models import Ingredient, Unit
 
 
-class Command(BaseCommand):
+class Command(BaseImportCommand):
     help = "Импорт ингридиентов"
+    fields = ["name", "measurement_unit"]
+    success_message = "Ингридиенты импортированы"
 
     def add_arguments(self, parser):
+        super().add_arguments(parser)
         parser.add_argument(
-            "-p",
-            "--path",
-            action="store",
-            required=True,
-            help="Путь к файлу с ингридиентами",
+            "--copy",
+            action="store_true",
+            help="Загрузить CSV через COPY (только PostgreSQL)",
         )
 
-    def handle(self, *args, **options):
-        with open(options["path"], encoding="utf8") as csv_file:
-            reader = list(csv.reader(csv_file))
-            Unit.objects.bulk_create(
-                [
-                    Unit(name=unit_name)
-                    for unit_name in {unit_name for _, unit_name in reader}
-                ],
-                ignore_conflicts=True,
-            )
-            unit_instances = Unit.objects.all()
-            unit_name_id = {unit.name: unit for unit in unit_instances}
-            Ingredient.objects.bulk_create(
-                [
-                    Ingredient(
-                        name=ingredient_name,
-                        measurement_unit=unit_name_id[unit_name],
-                    )
-                    for ingredient_name, unit_name in reader
-                ]
-            )
-
-        self.stdout.write(
-            self.style.SUCCESS("Ингридиенты успешно импортированы.")
+    def import_batch(self, rows, stats):
+        unit_names = {row["measurement_unit"] for row in rows}
+        Unit.objects.bulk_create(
+            [Unit(name=unit_name) for unit_name in unit_names],
+            ignore_conflicts=True,
+        )
+        unit_ids = dict(
+            Unit.objects.filter(name__in=unit_names).values_list("name", "id")
+        )
+        existing = set(
+            Ingredient.objects.filter(
+                name__in={row["name"] for row in rows},
+                measurement_unit_id__in=unit_ids.values(),
+            ).values_list("name", "measurement_unit_id")
+        )
+        new = {}
+        for row in rows:
+            key = (row["name"], unit_ids[row["measurement_unit"]])
+            if key not in existing:
+                new[key] = Ingredient(
+                    name=key[0],
+                    search_name=key[0].lower(),
+                    measurement_unit_id=key[1],
+                )
+        Ingredient.objects.bulk_create(new.values(), ignore_conflicts=True)
+        stats["inserted"] += len(new)
+        stats["skipped"] += len(rows) - len(new)
+
+    def copy(self, options, stats):
+        if connection.vendor != "postgresql":
+            raise CommandError("COPY поддерживается только в PostgreSQL.")
+        if self.get_format(options) != "csv":
+            raise CommandError("COPY поддерживает только файлы CSV.")
+        with open(options["path"], encoding="utf8") as file:
+            with transaction.atomic(), connection.cursor() as cursor:
+                self.copy_file(file, cursor, stats)
+
+    def copy_file(self, file, cursor, stats):
+        unit_table = Unit._meta.db_table
+        ingredient_table = Ingredient._meta.db_table
+        cursor.execute(
+            "CREATE TEMP TABLE import_ingredients "
+            "(name varchar(200), measurement_unit varchar(200)) "
+            "ON COMMIT DROP"
+        )
+        cursor.copy_expert(
+            "COPY import_ingredients FROM STDIN WITH (FORMAT csv)", file
+        )
+        cursor.execute("SELECT count(*) FROM import_ingredients")
+        total = cursor.fetchone()[0]
+        cursor.execute(
+            f"INSERT INTO {unit_table} (name) "
+            "SELECT DISTINCT measurement_unit FROM import_ingredients "
+            "ON CONFLICT DO NOTHING"
         )
+        cursor.execute(
+            f"INSERT INTO {ingredient_table} "
+            "(name, search_name, measurement_unit_id, updated_at) "
+            "SELECT DISTINCT i.name, lower(i.name), u.id, now() "
+            "FROM import_ingredients i "
+            f"JOIN {unit_table} u ON u.name = i.measurement_unit "
+            "ON CONFLICT DO NOTHING"
+        )
+        stats["inserted"] += cursor.rowcount
+        stats["skipped"] += total - cursor.rowcount
+
+    def handle(self, *args, **options):
+        if not options["copy"]:
+            super().handle(*args, **options)
+        else:
+            stats = {"inserted": 0, "updated": 0, "skipped": 0}
+            self.copy(options, stats)
+            self.write_stats(stats)
+        invalidate_ingredient_index()
@@ -1,34 +1,35 @@
-import csv
-
-from django.core.management.base import BaseCommand
+from django.utils import timezone
 
+from recipes.importers import BaseImportCommand
 from recipes.models import Tag
+from recipes.tags import invalidate_tag_index
 
 
-class Command(BaseCommand):
+class Command(BaseImportCommand):
     help = "Импорт тегов"
+    fields = ["name", "color", "slug"]
+    success_message = "Теги импортированы"
 
-    def add_arguments(self, parser):
-        parser.add_argument(
-            "-p",
-            "--path",
-            action="store",
-            required=True,
-            help="Путь к файлу с тегами",
+    def import_batch(self, rows, stats):
+        rows = {row["slug"]: row for row in rows}.values()
+        existing = Tag.objects.in_bulk(
+            [row["slug"] for row in rows], field_name="slug"
         )
+        new, changed = [], []
+        for row in rows:
+            tag = existing.get(row["slug"])
+            if tag is None:
+                new.append(Tag(**row))
+            elif (tag.name, tag.color) != (row["name"], row["color"]):
+                tag.name, tag.color = row["name"], row["color"]
+                tag.updated_at = timezone.now()
+                changed.append(tag)
+        Tag.objects.bulk_create(new, ignore_conflicts=True)
+        Tag.objects.bulk_update(changed, ["name", "color", "updated_at"])
+        stats["inserted"] += len(new)
+        stats["updated"] += len(changed)
+        stats["skipped"] += len(rows) - len(new) - len(changed)
 
     def handle(self, *args, **options):
-        with open(options["path"], encoding="utf8") as csv_file:
-            reader = csv.reader(csv_file)
-            Tag.objects.bulk_create(
-                [
-                    Tag(
-                        name=name,
-                        color=color,
-                        slug=slug,
-                    )
-                    for name, color, slug in reader
-                ]
-            )
-
-        self.stdout.write(self.style.SUCCESS("Теги успешно импортированы."))
+        super().handle(*args, **options)
+        invalidate_tag_index()
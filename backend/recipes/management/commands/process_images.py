@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+
+from recipes.images import run_image_processing
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    help = "Обработка изображений рецептов: миниатюры и WebP-варианты"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--all",
+            action="store_true",
+            help="Проверить все рецепты, а не только необработанные: "
+            "варианты пересоздаются, если изменился набор размеров",
+        )
+
+    def handle(self, *args, **options):
+        recipes = Recipe.objects.exclude(image="")
+        if not options["all"]:
+            recipes = recipes.filter(image_variants={})
+        recipe_ids = list(recipes.values_list("id", flat=True))
+        for recipe_id in recipe_ids:
+            run_image_processing(recipe_id)
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Обработано изображений: {len(recipe_ids)}."
+            )
+        )
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from recipes.search import update_search_index
+
+
+class Command(BaseCommand):
+    help = "Перестроение полнотекстового индекса рецептов"
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            update_search_index()
+
+        self.stdout.write(
+            self.style.SUCCESS("Поисковый индекс успешно перестроен.")
+        )
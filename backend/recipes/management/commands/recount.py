@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from recipes.counters import recount
+
+
+class Command(BaseCommand):
+    help = "Пересчёт счётчиков избранного, корзины, рецептов и подписчиков"
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            recount()
+
+        self.stdout.write(self.style.SUCCESS("Счётчики успешно пересчитаны."))
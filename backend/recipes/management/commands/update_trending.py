@@ -0,0 +1,81 @@
+import math
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from constants import Trending
+from recipes.importers import batched
+from recipes.models import Favorite, Recipe
+
+
+def log_add_exp(first, second):
+    if first is None:
+        return second
+    high, low = max(first, second), min(first, second)
+    return high + math.log1p(math.exp(low - high))
+
+
+class Command(BaseCommand):
+    help = (
+        "Пересчёт рейтинга популярности рецептов. Рейтинг хранится как "
+        "логарифм суммы exp((t - EPOCH) / DECAY_SECONDS) по добавлениям в "
+        "избранное, поэтому новые добавления учитываются инкрементально."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--full",
+            action="store_true",
+            help="Пересчитать рейтинг по всем добавлениям в избранное",
+        )
+
+    def handle(self, *args, **options):
+        last_id = None
+        if not options["full"]:
+            last_id = cache.get(Trending.WATERMARK_CACHE_KEY.value)
+        full = last_id is None
+
+        with transaction.atomic():
+            if full:
+                Recipe.objects.update(trending_score=0)
+                last_id = 0
+            scores = {}
+            favorites = (
+                Favorite.objects.filter(id__gt=last_id)
+                .order_by("id")
+                .values_list("id", "recipe_id", "created_at")
+            )
+            for favorite_id, recipe_id, created_at in favorites.iterator():
+                weight = (
+                    created_at - Trending.EPOCH.value
+                ).total_seconds() / Trending.DECAY_SECONDS.value
+                scores[recipe_id] = log_add_exp(scores.get(recipe_id), weight)
+                last_id = favorite_id
+
+            for batch in batched(scores.items(), Trending.BATCH_SIZE.value):
+                current = dict(
+                    Recipe.objects.filter(
+                        pk__in=[recipe_id for recipe_id, _ in batch],
+                        trending_score__gt=0,
+                    ).values_list("id", "trending_score")
+                )
+                Recipe.objects.bulk_update(
+                    [
+                        Recipe(
+                            pk=recipe_id,
+                            trending_score=log_add_exp(
+                                current.get(recipe_id), score
+                            ),
+                        )
+                        for recipe_id, score in batch
+                    ],
+                    ["trending_score"],
+                )
+        cache.set(Trending.WATERMARK_CACHE_KEY.value, last_id, None)
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Рейтинг популярности обновлён для {len(scores)} рецептов."
+            )
+        )
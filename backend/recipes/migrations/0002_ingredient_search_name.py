@@ -0,0 +1,32 @@
+# Generated by Django 3.2.3 on 2026-10-18 12:00
+
+from django.db import migrations, models
+
+
+def fill_search_name(apps, schema_editor):
+    Ingredient = apps.get_model('recipes', 'Ingredient')
+    ingredients = list(Ingredient.objects.all())
+    for ingredient in ingredients:
+        ingredient.search_name = ingredient.name.lower()
+    Ingredient.objects.bulk_update(ingredients, ['search_name'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ingredient',
+            name='search_name',
+            field=models.CharField(default='', editable=False, max_length=200, verbose_name='Название для поиска'),
+            preserve_default=False,
+        ),
+        migrations.AddIndex(
+            model_name='ingredient',
+            index=models.Index(fields=['search_name'], name='ingredient_search_name_idx', opclasses=['varchar_pattern_ops']),
+        ),
+        migrations.RunPython(fill_search_name, migrations.RunPython.noop),
+    ]
@@ -1,9 +1,10 @@
 from colorfield.fields import ColorField
 from django.contrib.auth import get_user_model
+from django.contrib.postgres.search import SearchVectorField
 from django.core.validators import MaxValueValidator, MinValueValidator
 from django.db import models
 
-from constants import RecipesModels
+from constants import RecipeImages, RecipesModels
 
 User = get_user_model()
 
@@ -16,6 +17,7 @@ class Tag(models.Model):
     )
     color = ColorField(format="hex", verbose_name="Цвет в формате HEX")
     slug = models.SlugField(unique=True, verbose_name="Слаг")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Изменён")
 
     class Meta:
         verbose_name = "Тег"
@@ -51,6 +53,12 @@ class Ingredient(models.Model):
         on_delete=models.CASCADE,
         verbose_name="Единица измерения",
     )
+    search_name = models.CharField(
+        max_length=RecipesModels.MAX_LEN_INGREDIENT_NAME.value,
+        editable=False,
+        verbose_name="Название для поиска",
+    )
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Изменён")
 
     class Meta:
         constraints = [
@@ -58,6 +66,13 @@ class Ingredient(models.Model):
                 fields=["name", "measurement_unit"], name="unique_ingredient"
             )
         ]
+        indexes = [
+            models.Index(
+                fields=["search_name"],
+                name="ingredient_search_name_idx",
+                opclasses=["varchar_pattern_ops"],
+            )
+        ]
         ordering = ["name"]
         verbose_name = "Ингредиент"
         verbose_name_plural = "Ингредиенты"
@@ -65,6 +80,10 @@ class Ingredient(models.Model):
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        self.search_name = self.name.lower()
+        super().save(*args, **kwargs)
+
 
 class Recipe(models.Model):
     tags = models.ManyToManyField(
@@ -84,7 +103,13 @@ class Recipe(models.Model):
         verbose_name="Название",
     )
     image = models.ImageField(
-        upload_to="recipes/images/", verbose_name="Изображение"
+        upload_to=RecipeImages.UPLOAD_TO.value, verbose_name="Изображение"
+    )
+    image_variants = models.JSONField(
+        default=dict,
+        blank=True,
+        editable=False,
+        verbose_name="Варианты изображения",
     )
     text = models.TextField(verbose_name="Описание")
     cooking_time = models.PositiveSmallIntegerField(
@@ -106,8 +131,33 @@ class Recipe(models.Model):
         ],
         verbose_name="Время приготовления, мин.",
     )
+    favorites_count = models.PositiveIntegerField(
+        default=0, editable=False, verbose_name="Добавлений в избранное"
+    )
+    cart_count = models.PositiveIntegerField(
+        default=0, editable=False, verbose_name="Добавлений в корзину"
+    )
+    trending_score = models.FloatField(
+        default=0, editable=False, verbose_name="Рейтинг популярности"
+    )
+    search_vector = SearchVectorField(
+        null=True, editable=False, verbose_name="Поисковый вектор"
+    )
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Изменён")
 
     class Meta:
+        indexes = [
+            models.Index(
+                fields=["-favorites_count", "-id"], name="recipe_popular_idx"
+            ),
+            models.Index(
+                fields=["-trending_score", "-id"], name="recipe_trending_idx"
+            ),
+            models.Index(
+                fields=["cooking_time", "-id"], name="recipe_cooking_time_idx"
+            ),
+            models.Index(fields=["author", "-id"], name="recipe_author_idx"),
+        ]
         ordering = ["-id"]
         verbose_name = "Рецепт"
         verbose_name_plural = "Рецепты"
@@ -128,6 +178,9 @@ class RecipeTag(models.Model):
                 fields=["recipe", "tag"], name="unique_recipe_tag"
             )
         ]
+        indexes = [
+            models.Index(fields=["tag", "recipe"], name="recipe_tag_tag_idx")
+        ]
         verbose_name = "Тег рецепта"
         verbose_name_plural = "Теги рецепта"
 
@@ -165,6 +218,12 @@ class RecipeIngredient(models.Model):
                 name="unique_recipe_ingredient",
             )
         ]
+        indexes = [
+            models.Index(
+                fields=["ingredient", "recipe"],
+                name="recipe_ingredient_rev_idx",
+            ),
+        ]
         verbose_name = "Ингредиент рецепта"
         verbose_name_plural = "Ингредиенты рецепта"
 
@@ -192,12 +251,21 @@ class UserRecipe(models.Model):
                 fields=["user", "recipe"], name="unique_%(class)s"
             )
         ]
+        indexes = [
+            models.Index(
+                fields=["recipe", "user"], name="%(class)s_recipe_user_idx"
+            )
+        ]
 
     def __str__(self):
         return f"{self.user} - {self.recipe}"
 
 
 class Favorite(UserRecipe):
+    created_at = models.DateTimeField(
+        auto_now_add=True, db_index=True, verbose_name="Добавлено"
+    )
+
     class Meta(UserRecipe.Meta):
         verbose_name = "Избранное"
         verbose_name_plural = "Избранное"
@@ -0,0 +1,81 @@
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import CharField, Value
+from django.utils.functional import cached_property
+
+from constants import Relationships
+from users.models import Subscription
+
+from .models import Favorite, ShoppingCart
+
+FAVORITES = "favorites"
+SHOPPING_CART = "shopping_cart"
+SUBSCRIPTIONS = "subscriptions"
+
+
+def empty_relationships():
+    return {kind: set() for kind in (FAVORITES, SHOPPING_CART, SUBSCRIPTIONS)}
+
+
+def get_version_key(user_id):
+    return Relationships.VERSION_CACHE_KEY.value.format(user_id)
+
+
+def load_relationships(user):
+    def ids(model, field, kind):
+        return (
+            model.objects.filter(user=user)
+            .annotate(kind=Value(kind, output_field=CharField()))
+            .order_by()
+            .values_list(field, "kind")
+        )
+
+    relationships = empty_relationships()
+    for pk, kind in ids(Favorite, "recipe_id", FAVORITES).union(
+        ids(ShoppingCart, "recipe_id", SHOPPING_CART),
+        ids(Subscription, "author_id", SUBSCRIPTIONS),
+        all=True,
+    ):
+        relationships[kind].add(pk)
+    return relationships
+
+
+def get_relationships(user):
+    if not settings.RELATIONSHIPS_CACHE_TIMEOUT:
+        return load_relationships(user)
+    version = cache.get_or_set(get_version_key(user.id), uuid4().hex, None)
+    key = Relationships.CACHE_KEY.value.format(user.id, version)
+    relationships = cache.get(key)
+    if relationships is None:
+        relationships = load_relationships(user)
+        cache.set(key, relationships, settings.RELATIONSHIPS_CACHE_TIMEOUT)
+    return relationships
+
+
+def invalidate_relationships(user_ids):
+    cache.set_many(
+        {get_version_key(user_id): uuid4().hex for user_id in set(user_ids)},
+        None,
+    )
+
+
+class RelationshipSnapshot:
+    def __init__(self, user):
+        self.user = user
+
+    @cached_property
+    def ids(self):
+        if self.user.is_anonymous:
+            return empty_relationships()
+        return get_relationships(self.user)
+
+    def is_favorited(self, recipe):
+        return recipe.pk in self.ids[FAVORITES]
+
+    def is_in_shopping_cart(self, recipe):
+        return recipe.pk in self.ids[SHOPPING_CART]
+
+    def is_subscribed(self, author):
+        return author.pk in self.ids[SUBSCRIPTIONS]
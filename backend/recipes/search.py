@@ -0,0 +1,115 @@
+import re
+
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db import connection
+from django.db.models import F, FloatField, Q
+from django.db.models.expressions import RawSQL
+
+from constants import Search
+
+POSTGRES_INDEX_SQL = """
+    UPDATE recipes_recipe AS recipe SET search_vector =
+        setweight(to_tsvector(%s::regconfig, recipe.name), 'A')
+        || setweight(to_tsvector(%s::regconfig, coalesce((
+            SELECT string_agg(ingredient.name, ' ')
+            FROM recipes_recipeingredient AS recipe_ingredient
+            JOIN recipes_ingredient AS ingredient
+                ON ingredient.id = recipe_ingredient.ingredient_id
+            WHERE recipe_ingredient.recipe_id = recipe.id
+        ), '')), 'B')
+        || setweight(to_tsvector(%s::regconfig, recipe.text), 'C')
+"""
+
+SQLITE_INDEX_SQL = f"""
+    INSERT INTO {Search.FTS_TABLE.value} (rowid, name, text, ingredients)
+    SELECT recipe.id, recipe.name, recipe.text, coalesce((
+        SELECT group_concat(ingredient.name, ' ')
+        FROM recipes_recipeingredient AS recipe_ingredient
+        JOIN recipes_ingredient AS ingredient
+            ON ingredient.id = recipe_ingredient.ingredient_id
+        WHERE recipe_ingredient.recipe_id = recipe.id
+    ), '')
+    FROM recipes_recipe AS recipe
+"""
+
+
+def update_search_index(recipe_ids=None):
+    with connection.cursor() as cursor:
+        if connection.vendor == "postgresql":
+            config = Search.CONFIG.value
+            if recipe_ids is None:
+                cursor.execute(POSTGRES_INDEX_SQL, [config] * 3)
+            else:
+                cursor.execute(
+                    POSTGRES_INDEX_SQL + " WHERE recipe.id = ANY(%s)",
+                    [config] * 3 + [list(recipe_ids)],
+                )
+        elif connection.vendor == "sqlite":
+            if recipe_ids is None:
+                cursor.execute(f"DELETE FROM {Search.FTS_TABLE.value}")
+                cursor.execute(SQLITE_INDEX_SQL)
+            else:
+                remove_from_search_index(recipe_ids)
+                placeholders = ", ".join(["%s"] * len(recipe_ids))
+                cursor.execute(
+                    SQLITE_INDEX_SQL + f" WHERE recipe.id IN ({placeholders})",
+                    list(recipe_ids),
+                )
+
+
+def remove_from_search_index(recipe_ids):
+    if connection.vendor != "sqlite" or not recipe_ids:
+        return
+    placeholders = ", ".join(["%s"] * len(recipe_ids))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"DELETE FROM {Search.FTS_TABLE.value} "
+            f"WHERE rowid IN ({placeholders})",
+            list(recipe_ids),
+        )
+
+
+def search_recipes(queryset, query):
+    if connection.vendor == "postgresql":
+        search_query = SearchQuery(
+            query, config=Search.CONFIG.value, search_type="websearch"
+        )
+        return (
+            queryset.filter(search_vector=search_query)
+            .annotate(search_rank=SearchRank(F("search_vector"), search_query))
+            .order_by("-search_rank", "-id")
+        )
+    words = re.findall(r"\w+", query)
+    if not words:
+        return queryset.none()
+    if connection.vendor == "sqlite":
+        match = " ".join(f'"{word}"*' for word in words)
+        table = Search.FTS_TABLE.value
+        return (
+            queryset.filter(
+                pk__in=RawSQL(
+                    f"SELECT rowid FROM {table} WHERE {table} MATCH %s",
+                    [match],
+                )
+            )
+            .annotate(
+                search_rank=RawSQL(
+                    f"SELECT -bm25({table}, 10.0, 1.0, 5.0) FROM {table} "
+                    f"WHERE {table} MATCH %s "
+                    f"AND {table}.rowid = recipes_recipe.id",
+                    [match],
+                    output_field=FloatField(),
+                )
+            )
+            .order_by("-search_rank", "-id")
+        )
+    condition = Q()
+    for word in words:
+        condition &= (
+            Q(name__icontains=word)
+            | Q(text__icontains=word)
+            | Q(ingredients__name__icontains=word)
+        )
+    return queryset.filter(
+        pk__in=queryset.model.objects.filter(condition).values("pk")
+    )
@@ -0,0 +1,70 @@
+from functools import partial
+from uuid import uuid4
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Case, CharField, F, IntegerField, Sum, Value, When
+
+from constants import ShoppingList
+
+from .models import RecipeIngredient, ShoppingCart
+
+
+def get_version_key(user_id):
+    return ShoppingList.VERSION_CACHE_KEY.value.format(user_id)
+
+
+def aggregate_shopping_list(user):
+    unit_name = "ingredient__measurement_unit__name"
+    unit_conversions = ShoppingList.UNIT_CONVERSIONS.value
+    return (
+        RecipeIngredient.objects.filter(recipe__shoppingcart__user=user)
+        .annotate(
+            name=F("ingredient__name"),
+            measurement_unit=Case(
+                *[
+                    When(**{unit_name: unit}, then=Value(base_unit))
+                    for unit, (base_unit, _) in unit_conversions.items()
+                ],
+                default=F(unit_name),
+                output_field=CharField(),
+            ),
+        )
+        .values("name", "measurement_unit")
+        .annotate(
+            total_amount=Sum(
+                Case(
+                    *[
+                        When(**{unit_name: unit}, then=F("amount") * ratio)
+                        for unit, (_, ratio) in unit_conversions.items()
+                    ],
+                    default=F("amount"),
+                    output_field=IntegerField(),
+                )
+            )
+        )
+        .order_by("name", "measurement_unit")
+    )
+
+
+def get_shopping_list(user):
+    version = cache.get_or_set(get_version_key(user.id), uuid4().hex, None)
+    key = ShoppingList.CACHE_KEY.value.format(user.id, version)
+    shopping_list = cache.get(key)
+    if shopping_list is None:
+        shopping_list = {
+            "recipes_count": ShoppingCart.objects.filter(user=user).count(),
+            "ingredients": list(aggregate_shopping_list(user).iterator()),
+        }
+        cache.set(key, shopping_list, ShoppingList.CACHE_TIMEOUT.value)
+    return shopping_list
+
+
+def bump_versions(keys):
+    cache.set_many({key: uuid4().hex for key in keys}, None)
+
+
+def invalidate_shopping_lists(user_ids):
+    keys = [get_version_key(user_id) for user_id in set(user_ids)]
+    if keys:
+        transaction.on_commit(partial(bump_versions, keys))
@@ -0,0 +1,142 @@
+from functools import partial
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from users.models import Subscription
+
+from .autocomplete import invalidate_ingredient_index
+from .counters import change_counter
+from .models import Favorite, Ingredient, Recipe, ShoppingCart, Tag, Unit
+from .relationships import invalidate_relationships
+from .search import remove_from_search_index, update_search_index
+from .shopping_list import invalidate_shopping_lists
+from .tags import invalidate_tag_index
+
+User = get_user_model()
+
+
+@receiver([post_save, post_delete], sender=ShoppingCart)
+def shopping_cart_changed(sender, instance, **kwargs):
+    invalidate_shopping_lists([instance.user_id])
+
+
+@receiver([post_save, post_delete], sender=Favorite)
+@receiver([post_save, post_delete], sender=ShoppingCart)
+@receiver([post_save, post_delete], sender=Subscription)
+def relationships_changed(sender, instance, **kwargs):
+    transaction.on_commit(
+        partial(invalidate_relationships, [instance.user_id])
+    )
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_changed(sender, instance, created, **kwargs):
+    if not created:
+        invalidate_shopping_lists(
+            ShoppingCart.objects.filter(recipe=instance).values_list(
+                "user_id", flat=True
+            )
+        )
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_search_changed(sender, instance, **kwargs):
+    transaction.on_commit(partial(update_search_index, [instance.pk]))
+
+
+@receiver(post_delete, sender=Recipe)
+def recipe_search_deleted(sender, instance, **kwargs):
+    remove_from_search_index([instance.pk])
+
+
+@receiver(post_save, sender=Ingredient)
+def ingredient_search_changed(sender, instance, created, **kwargs):
+    if not created:
+        recipe_ids = list(instance.recipe_set.values_list("id", flat=True))
+        if recipe_ids:
+            transaction.on_commit(partial(update_search_index, recipe_ids))
+
+
+@receiver([post_save, post_delete], sender=Ingredient)
+def ingredient_index_changed(sender, instance, **kwargs):
+    invalidate_ingredient_index()
+
+
+@receiver([post_save, post_delete], sender=Tag)
+def tag_index_changed(sender, instance, **kwargs):
+    invalidate_tag_index()
+
+
+@receiver(post_save, sender=Unit)
+def unit_index_changed(sender, instance, created, **kwargs):
+    if not created:
+        instance.ingredients.update(updated_at=timezone.now())
+        invalidate_ingredient_index()
+
+
+@receiver(post_save, sender=Ingredient)
+def ingredient_changed(sender, instance, created, **kwargs):
+    if not created:
+        invalidate_shopping_lists(
+            ShoppingCart.objects.filter(
+                recipe__ingredients=instance
+            ).values_list("user_id", flat=True)
+        )
+
+
+@receiver(post_save, sender=Unit)
+def unit_changed(sender, instance, created, **kwargs):
+    if not created:
+        invalidate_shopping_lists(
+            ShoppingCart.objects.filter(
+                recipe__ingredients__measurement_unit=instance
+            ).values_list("user_id", flat=True)
+        )
+
+
+@receiver(post_save, sender=Favorite)
+def favorite_added(sender, instance, created, **kwargs):
+    if created:
+        change_counter(Recipe, instance.recipe_id, "favorites_count", 1)
+
+
+@receiver(post_delete, sender=Favorite)
+def favorite_deleted(sender, instance, **kwargs):
+    change_counter(Recipe, instance.recipe_id, "favorites_count", -1)
+
+
+@receiver(post_save, sender=ShoppingCart)
+def shopping_cart_added(sender, instance, created, **kwargs):
+    if created:
+        change_counter(Recipe, instance.recipe_id, "cart_count", 1)
+
+
+@receiver(post_delete, sender=ShoppingCart)
+def shopping_cart_deleted(sender, instance, **kwargs):
+    change_counter(Recipe, instance.recipe_id, "cart_count", -1)
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_added(sender, instance, created, **kwargs):
+    if created:
+        change_counter(User, instance.author_id, "recipes_count", 1)
+
+
+@receiver(post_delete, sender=Recipe)
+def recipe_deleted(sender, instance, **kwargs):
+    change_counter(User, instance.author_id, "recipes_count", -1)
+
+
+@receiver(post_save, sender=Subscription)
+def subscription_added(sender, instance, created, **kwargs):
+    if created:
+        change_counter(User, instance.author_id, "subscribers_count", 1)
+
+
+@receiver(post_delete, sender=Subscription)
+def subscription_deleted(sender, instance, **kwargs):
+    change_counter(User, instance.author_id, "subscribers_count", -1)
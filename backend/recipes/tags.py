@@ -0,0 +1,30 @@
+from constants import Tags
+
+from .indexes import ModelIndex
+from .models import Tag
+
+
+class TagIndex(ModelIndex):
+    model = Tag
+    check_interval = Tags.INDEX_CHECK_INTERVAL.value
+
+    def build(self, queryset):
+        return dict(queryset.order_by("slug").values_list("slug", "id"))
+
+    def get_choices(self):
+        return [(slug, slug) for slug in self.get()]
+
+    def get_ids(self, slugs):
+        tags = self.get()
+        return {tags[slug] for slug in slugs if slug in tags}
+
+
+tag_index = TagIndex()
+
+
+def get_tag_choices():
+    return tag_index.get_choices()
+
+
+def invalidate_tag_index():
+    tag_index.invalidate()
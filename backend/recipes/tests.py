@@ -0,0 +1,23 @@
+from io import StringIO
+
+from django.core.management.base import CommandError
+from django.test import SimpleTestCase
+
+from .importers import iter_json_array
+
+
+class IterJsonArrayTests(SimpleTestCase):
+    def test_items_split_across_chunks(self):
+        data = '[1, 23456 ,\n{"name": "Молоко", "units": ["г", "кг"]}, "x"]'
+        for chunk_size in (1, 2, 3, 5, 64):
+            with self.subTest(chunk_size=chunk_size):
+                self.assertEqual(
+                    list(iter_json_array(StringIO(data), chunk_size)),
+                    [1, 23456, {"name": "Молоко", "units": ["г", "кг"]}, "x"],
+                )
+
+    def test_invalid_input(self):
+        for data in ("{}", "[1, 2", '[{"name": ]', "[123"):
+            with self.subTest(data=data):
+                with self.assertRaises(CommandError):
+                    list(iter_json_array(StringIO(data), 2))
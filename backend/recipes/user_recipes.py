@@ -0,0 +1,109 @@
+from functools import partial
+
+from django.db import connections, router, transaction
+from django.db.models import F
+from django.db.models.sql import InsertQuery
+
+from .counters import change_counter, count_subquery
+from .models import Favorite, Recipe, ShoppingCart
+from .relationships import invalidate_relationships
+from .shopping_list import invalidate_shopping_lists
+
+COUNTER_FIELDS = {
+    Favorite: "favorites_count",
+    ShoppingCart: "cart_count",
+}
+
+
+# Private ORM API, checked against Django 3.2: InsertQuery with
+# ignore_conflicts and QuerySet._raw_delete() report the affected row
+# counts that bulk_create() and delete() hide. Recheck on upgrade.
+def insert_ignore_conflicts(model, objs, using):
+    query = InsertQuery(model, ignore_conflicts=True)
+    query.insert_values(
+        [
+            field
+            for field in model._meta.concrete_fields
+            if not field.primary_key
+        ],
+        objs,
+    )
+    inserted = 0
+    with connections[using].cursor() as cursor:
+        for sql, params in query.get_compiler(using=using).as_sql():
+            cursor.execute(sql, params)
+            inserted += cursor.rowcount
+    return inserted
+
+
+def delete_returning_count(queryset):
+    return queryset._raw_delete(queryset.db)
+
+
+def add_user_recipes(model, user, recipe_ids):
+    recipe_ids = list(dict.fromkeys(recipe_ids))
+    if not recipe_ids:
+        return 0
+    counter = COUNTER_FIELDS[model]
+    using = router.db_for_write(model)
+    with transaction.atomic(using=using):
+        created = insert_ignore_conflicts(
+            model,
+            [
+                model(user=user, recipe_id=recipe_id)
+                for recipe_id in recipe_ids
+            ],
+            using,
+        )
+        if created:
+            if len(recipe_ids) == 1:
+                change_counter(Recipe, recipe_ids[0], counter, 1)
+            else:
+                Recipe.objects.filter(pk__in=recipe_ids).update(
+                    **{counter: count_subquery(model, "recipe")}
+                )
+            transaction.on_commit(
+                partial(invalidate_relationships, [user.id]), using=using
+            )
+    if created and model is ShoppingCart:
+        invalidate_shopping_lists([user.id])
+    return created
+
+
+def remove_user_recipes(model, user, recipe_ids=None):
+    using = router.db_for_write(model)
+    queryset = model.objects.using(using).filter(user=user)
+    if recipe_ids is not None:
+        recipe_ids = list(dict.fromkeys(recipe_ids))
+        if not recipe_ids:
+            return 0
+        queryset = queryset.filter(recipe_id__in=recipe_ids)
+    counter = COUNTER_FIELDS[model]
+    with transaction.atomic(using=using):
+        if recipe_ids is not None and len(recipe_ids) == 1:
+            deleted = delete_returning_count(queryset)
+            removed_ids = recipe_ids if deleted else []
+        else:
+            rows = dict(
+                queryset.select_for_update().values_list("pk", "recipe_id")
+            )
+            removed_ids = list(rows.values())
+            deleted = (
+                delete_returning_count(queryset.filter(pk__in=rows))
+                if rows
+                else 0
+            )
+        if not deleted:
+            return 0
+        if len(removed_ids) == 1:
+            change_counter(Recipe, removed_ids[0], counter, -1)
+        else:
+            Recipe.objects.filter(
+                pk__in=removed_ids, **{f"{counter}__gt": 0}
+            ).update(**{counter: F(counter) - 1})
+        transaction.on_commit(
+            partial(invalidate_relationships, [user.id]), using=using
+        )
+    if model is ShoppingCart:
+        invalidate_shopping_lists([user.id])
+    return deleted
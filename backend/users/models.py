@@ -13,6 +13,12 @@ class User(AbstractUser):
         _("last name"), max_length=UsersModels.MAX_LEN_USER_LAST_NAME.value
     )
     email = models.EmailField(_("email address"), unique=True)
+    recipes_count = models.PositiveIntegerField(
+        default=0, editable=False, verbose_name="Количество рецептов"
+    )
+    subscribers_count = models.PositiveIntegerField(
+        default=0, editable=False, verbose_name="Количество подписчиков"
+    )
 
     USERNAME_FIELD = "email"
     REQUIRED_FIELDS = ["username", "first_name", "last_name"]
@@ -46,6 +52,11 @@ class Subscription(models.Model):
                 fields=["author", "user"], name="unique_subscription"
             )
         ]
+        indexes = [
+            models.Index(
+                fields=["user", "author"], name="subscription_user_idx"
+            )
+        ]
         verbose_name = "Подписка"
         verbose_name_plural = "Подписки"
 
@@ -0,0 +1,26 @@
+from functools import partial
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from .tokens import token_cache
+
+User = get_user_model()
+
+
+@receiver(post_delete, sender=Token)
+def token_deleted(sender, instance, **kwargs):
+    transaction.on_commit(partial(token_cache.delete_many, [instance.key]))
+
+
+@receiver(post_save, sender=User)
+def user_changed(sender, instance, created, **kwargs):
+    if not created:
+        keys = list(
+            Token.objects.filter(user=instance).values_list("key", flat=True)
+        )
+        if keys:
+            transaction.on_commit(partial(token_cache.delete_many, keys))
@@ -0,0 +1,100 @@
+from collections import OrderedDict
+from hashlib import sha256
+from threading import Lock
+from time import monotonic
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from rest_framework.authtoken.models import Token
+
+from constants import Auth
+
+User = get_user_model()
+
+
+class LRUCache:
+    def __init__(self, maxsize, timeout):
+        self.maxsize = maxsize
+        self.timeout = timeout
+        self.items = OrderedDict()
+        self.lock = Lock()
+
+    def get(self, key):
+        with self.lock:
+            item = self.items.get(key)
+            if item is None:
+                return None
+            value, expires = item
+            if expires < monotonic():
+                del self.items[key]
+                return None
+            self.items.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        if not self.maxsize:
+            return
+        with self.lock:
+            self.items[key] = (value, monotonic() + self.timeout)
+            self.items.move_to_end(key)
+            while len(self.items) > self.maxsize:
+                self.items.popitem(last=False)
+
+    def delete(self, key):
+        with self.lock:
+            self.items.pop(key, None)
+
+
+class TokenCache:
+    def __init__(self):
+        self.local = LRUCache(
+            settings.TOKEN_CACHE_SIZE, settings.TOKEN_CACHE_LOCAL_TIMEOUT
+        )
+
+    def get_shared_key(self, key):
+        return Auth.TOKEN_CACHE_KEY.value.format(
+            sha256(key.encode()).hexdigest()
+        )
+
+    def dump(self, token):
+        return token.created, token.user._state.db, {
+            field.attname: getattr(token.user, field.attname)
+            for field in User._meta.concrete_fields
+            if field.name in Auth.TOKEN_CACHE_USER_FIELDS.value
+        }
+
+    def load(self, key, data):
+        created, db, fields = data
+        user = User.from_db(db, list(fields), list(fields.values()))
+        token = Token(key=key, user=user, created=created)
+        token._state.adding = False
+        token._state.db = db
+        return token
+
+    def get(self, key):
+        data = self.local.get(key)
+        if data is None and settings.TOKEN_CACHE_SHARED:
+            data = cache.get(self.get_shared_key(key))
+            if data is not None:
+                self.local.set(key, data)
+        if data is None:
+            return None
+        return self.load(key, data)
+
+    def set(self, key, token):
+        data = self.dump(token)
+        self.local.set(key, data)
+        if settings.TOKEN_CACHE_SHARED:
+            cache.set(
+                self.get_shared_key(key), data, settings.TOKEN_CACHE_TIMEOUT
+            )
+
+    def delete_many(self, keys):
+        for key in keys:
+            self.local.delete(key)
+        if settings.TOKEN_CACHE_SHARED:
+            cache.delete_many([self.get_shared_key(key) for key in keys])
+
+
+token_cache = TokenCache()